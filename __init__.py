@@ -25,12 +25,14 @@ bl_info = {
     "category": "Node",
 }
 
-from . import operators, prefs, ui, menu_generator, update_handlers
-modules = (operators, prefs, ui, menu_generator, update_handlers)
+from . import operators, prefs, ui, menu_generator, update_handlers, library_watcher, library_health
+from .perf_stats import stats
+modules = (operators, prefs, ui, menu_generator, update_handlers, library_watcher, library_health)
 
 def register():
-    for module in modules:
-        module.register()
+    with stats.timed("Register"):
+        for module in modules:
+            module.register()
 
 def unregister():
     for module in modules:
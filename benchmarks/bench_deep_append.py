@@ -0,0 +1,77 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_deep_append.py -- [output.json]
+# Compares appending the top of a 50-level deep nodegroup chain into a file that already holds the rest of the chain,
+# once with the old load-everything-then-dedupe path and once with the dependency closure from the config.
+import sys
+import tempfile
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, time_call, report
+
+DEPTH = 50
+
+
+def write_chain_library(filepath, depth=DEPTH):
+    groups = []
+    child = None
+
+    for level in reversed(range(depth)):
+        group = bpy.data.node_groups.new(f"Chain_{level:02}", 'GeometryNodeTree')
+        if child is not None:
+            group.nodes.new("GeometryNodeGroup").node_tree = child
+        groups.append(group)
+        child = group
+
+    bpy.data.libraries.write(str(filepath), set(groups), fake_user=True)
+
+    for group in groups:
+        bpy.data.node_groups.remove(group)
+
+
+def reset_to_dependencies(filepath):
+    # leaves Chain_01 and everything below it in the file, without Chain_00
+    for group in tuple(bpy.data.node_groups):
+        bpy.data.node_groups.remove(group)
+    for library in tuple(bpy.data.libraries):
+        bpy.data.libraries.remove(library)
+
+    with bpy.data.libraries.load(str(filepath), link=False) as (data_from, data_to):
+        data_to.node_groups = ["Chain_01"]
+
+
+def main():
+    args = script_args()
+    operators = enable_addon().operators
+
+    library = Path(tempfile.mkdtemp()) / "chain_library.blend"
+    write_chain_library(library)
+    closure = tuple(f"Chain_{level:02}" for level in range(1, DEPTH))
+
+    def dedupe_append():
+        old_groups = set(bpy.data.node_groups)
+        with bpy.data.libraries.load(str(library), link=False) as (data_from, data_to):
+            data_to.node_groups = ["Chain_00"]
+        added_groups = tuple(set(bpy.data.node_groups) - old_groups)
+        operators.NODE_OT_NODEGROUP_LIBRARY_append_group.remove_duplicate_imports(added_groups)
+
+    def closure_append():
+        operators.append_missing_dependencies(str(library), ["Chain_00"], [closure])
+
+    results = {}
+    for name, append in (("dedupe", dedupe_append), ("closure", closure_append)):
+        def run():
+            reset_to_dependencies(library)
+            append()
+
+        # the reset is timed on its own and subtracted, it is the same for both paths
+        total = time_call(run, repeat=20)
+        reset = time_call(lambda: reset_to_dependencies(library), repeat=20)
+        results[name] = {"append_ms": (total - reset) * 1000, "node_groups_after": len(bpy.data.node_groups)}
+
+    results["depth"] = DEPTH
+    report(results, output=args[0] if args else None)
+
+
+main()
@@ -0,0 +1,68 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_entry_toggle.py -- [--entries 100]
+#            [--groups 100] [--repeat 20] [--output results.json]
+# Times flipping one entry_list checkbox with many library entries, against rebuilding every menu.
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, scratch_preferences, time_call, report
+from synthetic_library import build_library
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_entry_toggle.py")
+    parser.add_argument("--entries", type=int, default=100, help="library entries in the preferences")
+    parser.add_argument("--groups", type=int, default=100, help="nodegroups per library")
+    parser.add_argument("--repeat", type=int, default=20, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    menu_generator = addon.menu_generator
+    config_builder = addon.config_builder
+
+    menu_generator.unregister()
+    folder = Path(tempfile.mkdtemp())
+    menu_generator.config_folder = folder
+    menu_generator.config_store = addon.config_store.ConfigStore(folder)
+
+    filepaths = []
+    for index in range(args.entries):
+        filepaths.append(build_library(folder / f"synthetic_{index}.blend", args.groups))
+        config_builder.generate_library_config(folder=folder, force=True)
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+    with scratch_preferences(addon) as prefs:
+        with menu_generator.deferred_sync():
+            for filepath in filepaths:
+                prefs.entry_list.add().filepath = str(filepath)
+
+        menu_generator.register()
+        entry = prefs.entry_list[args.entries // 2]
+
+        def toggle():
+            entry.is_enabled = not entry.is_enabled
+
+        def rebuild():
+            menu_generator.unregister()
+            menu_generator.register()
+
+        results = {
+            'entries': args.entries,
+            'groups_per_entry': args.groups,
+            'menus': len(menu_generator.menu_specs),
+            'toggle_ms': time_call(toggle, repeat=args.repeat * 2) * 1000,
+            'rebuild_ms': time_call(rebuild, repeat=args.repeat) * 1000,
+        }
+
+    report(results, output=args.output)
+
+
+main()
@@ -0,0 +1,74 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_folder_import.py -- [--files 300]
+#            [--groups 20] [--jobs 8] [--output results.json]
+# Times adding a nested folder of library files as entries, and validating them serially against a worker pool.
+import os
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, scratch_preferences, time_call, report
+from synthetic_library import build_library
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_folder_import.py")
+    parser.add_argument("--files", type=int, default=300, help="library files in the folder tree")
+    parser.add_argument("--groups", type=int, default=20, help="nodegroups per library")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="workers in the validation pool")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    prefs_module = addon.prefs
+    library_import = addon.library_import
+    headless = addon.headless
+
+    folder = Path(tempfile.mkdtemp())
+    for index in range(args.files):
+        subfolder = folder / f"set_{index % 10}" / f"part_{index % 3}"
+        subfolder.mkdir(parents=True, exist_ok=True)
+        build_library(subfolder / f"library_{index}.blend", args.groups)
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+    with scratch_preferences(addon) as prefs:
+        def clear_entries():
+            with addon.menu_generator.deferred_sync():
+                prefs.entry_list.clear()
+
+        def import_folder():
+            clear_entries()
+            prefs_module.add_library_entries(library_import.scan_blendfiles(folder))
+
+        def import_one_by_one():
+            # what adding each file with the single entry operator amounts to
+            clear_entries()
+            for filepath in library_import.scan_blendfiles(folder):
+                if str(filepath) in [item.filepath for item in prefs.entry_list]:
+                    continue
+                item = prefs.entry_list.add()
+                item.name = filepath.stem
+                item.filepath = str(filepath)
+                item.prefix = prefs_module.generate_prefix(filepath.stem)
+
+        filepaths = library_import.scan_blendfiles(folder)
+        results = {
+            'files': len(filepaths),
+            'jobs': args.jobs,
+            'scan_ms': time_call(lambda: library_import.scan_blendfiles(folder), repeat=5) * 1000,
+            'import_folder_ms': time_call(import_folder, repeat=3) * 1000,
+            'import_one_by_one_ms': time_call(import_one_by_one, repeat=3) * 1000,
+            'validate_serial_s': time_call(lambda: headless.run_pool(bpy.app.binary_path, filepaths, "validate", jobs=1), repeat=1),
+            'validate_pool_s': time_call(lambda: headless.run_pool(bpy.app.binary_path, filepaths, "validate", jobs=args.jobs), repeat=1),
+        }
+
+    report(results, output=args.output)
+
+
+main()
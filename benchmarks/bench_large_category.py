@@ -0,0 +1,80 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_large_category.py -- [--sizes 100,800,5000]
+#            [--page-size 100] [--repeat 50] [--output results.json]
+# Draws a single category holding every nodegroup, unsplit against split into pages.
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, time_call, report, StubLayout
+
+MENU_IDNAME = "NODE_MT_GN_LC_main"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_large_category.py")
+    parser.add_argument("--sizes", default="100,800,5000", help="comma separated nodegroup counts of the category")
+    parser.add_argument("--page-size", type=int, default=100, help="nodegroups per page when split")
+    parser.add_argument("--repeat", type=int, default=50, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def category_config(size):
+    nodegroups = {
+        f"GN_LC_{index:05}": {'label': f"Group {(index * 7919) % size:05}", 'node_tree': f"Group_{index}", 'icon': 'NONE'}
+        for index in range(size)}
+    menu = {
+        'label': "Large Category",
+        'icon': 'NONE',
+        'is_expandable': True,
+        'items': {'submenus': {}, 'nodegroups': {"0": list(nodegroups)}},
+    }
+    return {'menus': {MENU_IDNAME: menu}, 'nodegroups': nodegroups}
+
+
+def draw_calls(menu_class, method):
+    layout = StubLayout()
+    getattr(menu_class, method)(type("StubMenu", (), {"layout": layout})(), None)
+    return layout.calls
+
+
+def bench_size(addon, size, args):
+    menu_generator = addon.menu_generator
+    snapshot = addon.pref_snapshot.snapshot
+    data_dict = category_config(size)
+    menu_data = (MENU_IDNAME, data_dict['menus'][MENU_IDNAME])
+    results = {}
+
+    for name, page_size in (("unsplit", 0), ("split", args.page_size)):
+        snapshot.page_size = page_size
+        menu_class = menu_generator.generate_menu("//large_category.blend", menu_data, data_dict, 'GeometryNodeTree')
+        pages = menu_class.page_classes
+        results[name] = {
+            'generate_ms': time_call(
+                lambda: menu_generator.generate_menu("//large_category.blend", menu_data, data_dict, 'GeometryNodeTree'),
+                repeat=args.repeat) * 1000,
+            'pages': len(pages),
+            'menu_draw_calls': draw_calls(menu_class, "draw_compact"),
+            'menu_draw_ms': time_call(lambda: draw_calls(menu_class, "draw_compact"), repeat=args.repeat) * 1000,
+            'largest_page_draw_calls': max((draw_calls(page, "draw_compact") for page in pages), default=0),
+        }
+
+    return results
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    snapshot = addon.pref_snapshot.snapshot
+    page_size = snapshot.page_size
+
+    results = {'page_size': args.page_size, 'sizes': {}}
+    for size in (int(size) for size in args.sizes.split(",")):
+        results['sizes'][str(size)] = bench_size(addon, size, args)
+
+    snapshot.page_size = page_size
+    report(results, output=args.output)
+
+
+main()
@@ -0,0 +1,85 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_pref_import.py -- [--entries 500]
+#            [--repeat 10] [--output results.json]
+# Times importing a preferences preset with many entries, from scratch, unchanged, and with one entry changed.
+import sys
+import json
+import argparse
+import tempfile
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, time_call, report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_pref_import.py")
+    parser.add_argument("--entries", type=int, default=500, help="library entries in the preset")
+    parser.add_argument("--repeat", type=int, default=10, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def write_preset(filepath, entries, renamed=None):
+    entry_list = [{
+        "name": f"Library {index}" if index != renamed else "Renamed",
+        "prefix": f"L{index}",
+        "filepath": f"/library/{index}.blend",
+        "is_enabled": index % 3 != 0,
+        "import_mode": 'DEFAULT',
+        } for index in range(entries)]
+
+    with open(filepath, "w") as fp:
+        json.dump({"entry_list": entry_list, "ui_mode": 'COMPACT', "current_list_index": 0}, fp)
+    return filepath
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    prefs_handler = addon.prefs_handler
+    stats = addon.perf_stats.stats
+
+    folder = Path(tempfile.mkdtemp())
+    saved_cache_path = prefs_handler.cache_path
+    prefs_handler.cache_path = folder / "userprefs.json"
+
+    prefs = bpy.context.preferences.addons[addon.__name__].preferences
+    saved_dict = prefs_handler.serialize(prefs, prefs_handler.rna_schema(prefs.bl_rna))
+
+    preset = write_preset(folder / "preset.json", args.entries)
+    renamed_preset = write_preset(folder / "renamed.json", args.entries, renamed=args.entries // 2)
+
+    def import_fresh():
+        with addon.menu_generator.deferred_sync():
+            prefs.entry_list.clear()
+        prefs_handler.set_preference_values(preset)
+        prefs_handler.flush_pref_cache()
+
+    def import_unchanged():
+        prefs_handler.set_preference_values(preset)
+        prefs_handler.flush_pref_cache()
+
+    def import_one_change():
+        prefs_handler.set_preference_values(renamed_preset)
+        prefs_handler.set_preference_values(preset)
+        prefs_handler.flush_pref_cache()
+
+    stats.reset()
+    results = {
+        'entries': args.entries,
+        'import_fresh_ms': time_call(import_fresh, repeat=args.repeat) * 1000,
+        'import_unchanged_ms': time_call(import_unchanged, repeat=args.repeat) * 1000,
+        'import_one_change_ms': time_call(import_one_change, repeat=args.repeat) * 1000 / 2,
+        'entry_count_after': len(prefs.entry_list),
+        'cache_writes': stats.timings["Prefs Write"].count if "Prefs Write" in stats.timings else 0,
+    }
+
+    prefs_handler.apply_preferences(saved_dict)
+    prefs_handler.flush_pref_cache()
+    prefs_handler.cache_path = saved_cache_path
+    report(results, output=args.output)
+
+
+main()
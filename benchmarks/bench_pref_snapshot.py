@@ -0,0 +1,40 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_pref_snapshot.py -- [output.json]
+# The add-on has to be installed in Blender's add-on folder under the name of this repository's folder.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, time_call, report
+
+
+def main():
+    args = script_args()
+    addon = enable_addon()
+    fetch_user_prefs = addon.operators.fetch_user_prefs
+    snapshot = addon.pref_snapshot.snapshot
+
+    results = {}
+    for submenu_count in (1, 10, 100):
+        # the old draw path fetched ui_mode once and hide_empty_headers once per expanded submenu
+        def fetch_draw():
+            fetch_user_prefs("ui_mode")
+            for _ in range(submenu_count):
+                fetch_user_prefs("hide_empty_headers")
+
+        def snapshot_draw():
+            snapshot.ui_mode
+            snapshot.hide_empty_headers
+
+        fetch_time = time_call(fetch_draw)
+        snapshot_time = time_call(snapshot_draw)
+
+        results[f"submenus_{submenu_count}"] = {
+            "fetch_user_prefs_us": fetch_time * 1e6,
+            "snapshot_us": snapshot_time * 1e6,
+            "saving_us": (fetch_time - snapshot_time) * 1e6,
+        }
+
+    report(results, output=args[0] if args else None)
+
+
+main()
@@ -0,0 +1,62 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_pref_writes.py -- [--entries 200]
+#            [--repeat 10] [--output results.json]
+# Counts preference cache writes for a batch edit of the entry_list, against writing on every change.
+import sys
+import argparse
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, scratch_preferences, time_call, report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_pref_writes.py")
+    parser.add_argument("--entries", type=int, default=200, help="library entries in the preferences")
+    parser.add_argument("--repeat", type=int, default=10, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    prefs_handler = addon.prefs_handler
+    stats = addon.perf_stats.stats
+
+    # menus would otherwise be rebuilt for every toggle, which isn't what's measured here
+    addon.menu_generator.unregister()
+    with scratch_preferences(addon) as prefs:
+        for index in range(args.entries):
+            prefs.entry_list.add().filepath = f"/library/{index}.blend"
+        prefs_handler.flush_pref_cache()
+
+        def toggle_all():
+            mode = 'DISABLE' if prefs.entry_list[0].is_enabled else 'ENABLE'
+            bpy.ops.nodegroup_library.toggle_all_entries(mode=mode)
+            # timers don't run in background mode, so the pending write is flushed by hand
+            prefs_handler.flush_pref_cache()
+
+        def write_every_change():
+            for _ in range(args.entries):
+                prefs_handler.save_pref_cache(prefs_handler.cache_path)
+
+        stats.reset()
+        toggle_ms = time_call(toggle_all, repeat=args.repeat) * 1000
+        batched_writes = stats.timings["Prefs Write"].count
+
+        results = {
+            'entries': args.entries,
+            'cache_bytes': prefs_handler.cache_path.stat().st_size,
+            'updates_per_batch': args.entries,
+            'writes_per_batch': batched_writes / args.repeat,
+            'batch_ms': toggle_ms,
+            'write_every_change_ms': time_call(write_every_change, repeat=args.repeat) * 1000,
+        }
+
+    addon.menu_generator.register()
+    report(results, output=args.output)
+
+
+main()
@@ -0,0 +1,129 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_scaling.py -- [--sizes 10,100,1000,10000]
+#            [--depth 2] [--fanout 4] [--repeat 5] [--output results.json]
+# Generates a synthetic library per size and times config generation, menu registration, menu drawing and appends.
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, scratch_preferences, time_call, report, StubLayout
+from synthetic_library import build_library, group_name
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_scaling.py")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma separated nodegroup counts")
+    parser.add_argument("--depth", type=int, default=2, help="how many frames deep the categories are nested")
+    parser.add_argument("--fanout", type=int, default=4, help="subcategories per category")
+    parser.add_argument("--repeat", type=int, default=5, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def generate_menus(addon):
+    # every menu of the library, including the ones that would only be registered once requested
+    menu_generator = addon.menu_generator
+    return [menu_generator.generate_menu(*args) for signature, args in menu_generator.menu_specs.values()]
+
+
+def draw_menus(menu_classes, ui_mode):
+    # draws every menu once, dispatching the way NodegroupLibrary_BaseMenu.draw does
+    layout = StubLayout()
+    stub = type("StubMenu", (), {"layout": layout})()
+
+    for menu_class in menu_classes:
+        if menu_class.is_expandable and ui_mode == 'EXPANDED':
+            menu_class.draw_expanded(stub, None)
+        else:
+            menu_class.draw_compact(stub, None)
+
+    return layout.calls
+
+
+def bench_size(addon, folder, size, args):
+    menu_generator = addon.menu_generator
+    config_builder = addon.config_builder
+    operators = addon.operators
+    snapshot = addon.pref_snapshot.snapshot
+    results = {}
+
+    filepath = build_library(folder / f"synthetic_{size}.blend", size, args.depth, args.fanout)
+    results['update_json_ms'] = time_call(
+        lambda: config_builder.generate_library_config(folder=folder, force=True), repeat=args.repeat) * 1000
+
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+    # configs are parsed again on every run, as they would be when Blender starts
+    def register():
+        menu_generator.config_store.clear()
+        menu_generator.register()
+
+    register_total = unregister_total = 0.0
+    for _ in range(args.repeat):
+        register_total += time_call(register, repeat=1)
+        unregister_total += time_call(menu_generator.unregister, repeat=1)
+
+    results['register_ms'] = register_total / args.repeat * 1000
+    results['unregister_ms'] = unregister_total / args.repeat * 1000
+
+    menu_generator.register()
+    results['menus'] = len(menu_generator.menu_specs)
+    results['registered_menus'] = len(menu_generator.menu_classes)
+
+    # classes are generated once up front, so the draw times below hold nothing but drawing
+    results['generate_menus_ms'] = time_call(lambda: generate_menus(addon), repeat=args.repeat) * 1000
+    menu_classes = generate_menus(addon)
+
+    ui_mode = snapshot.ui_mode
+    for mode in ('COMPACT', 'EXPANDED'):
+        snapshot.ui_mode = mode
+        results[f'draw_{mode.lower()}_ms'] = time_call(lambda: draw_menus(menu_classes, mode), repeat=args.repeat) * 1000
+    snapshot.ui_mode = ui_mode
+
+    # the dependency is left in the file, so only the appended group itself has to be removed between runs
+    name = group_name(size // 2)
+
+    def append():
+        operators.append_library_nodegroups(str(filepath), [name])
+        bpy.data.node_groups.remove(bpy.data.node_groups[name])
+
+    results['append_group_ms'] = time_call(append, repeat=args.repeat) * 1000
+
+    menu_generator.unregister()
+    return results
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    menu_generator = addon.menu_generator
+
+    # the library's own configs stay out of the measurements
+    menu_generator.unregister()
+    folder = Path(tempfile.mkdtemp())
+    menu_generator.config_folder = folder
+    menu_generator.config_store = addon.config_store.ConfigStore(folder)
+
+    results = {
+        'blender': bpy.app.version_string,
+        'depth': args.depth,
+        'fanout': args.fanout,
+        'repeat': args.repeat,
+        'sizes': {},
+    }
+
+    # with no entries every config in the folder is loaded, instead of only the user's libraries
+    with scratch_preferences(addon):
+        for size in (int(size) for size in args.sizes.split(",")):
+            results['sizes'][str(size)] = bench_size(addon, folder, size, args)
+            # each size gets a config folder of its own
+            for config in folder.glob("*.json"):
+                config.unlink()
+
+    report(results, output=args.output)
+
+
+main()
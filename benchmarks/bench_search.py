@@ -0,0 +1,68 @@
+# Usage: python benchmarks/bench_search.py [output.json]
+# Times index builds, single config updates and queries on a synthetic 50k nodegroup library.
+# search_index doesn't use bpy, so it is loaded on its own and this runs without Blender.
+import sys
+import random
+import importlib.util
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import time_call, report
+
+spec = importlib.util.spec_from_file_location("search_index", Path(__file__).parent.parent / "search_index.py")
+search_index = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(search_index)
+
+WORDS = (
+    "noise", "mix", "color", "ramp", "vector", "scatter", "curve", "mesh", "bevel", "edge", "wear", "rust", "metal",
+    "wood", "grain", "brick", "tile", "mask", "blend", "fresnel", "voronoi", "wave", "distort", "rotate", "scale",
+    "points", "instance", "random", "uv", "normal", "height", "bump", "dirt", "scratch", "paint", "glass", "water",
+    "rock", "sand", "snow",
+)
+QUERIES = ("n", "no", "noise", "nosie", "rust metal", "scat inst", "voronoi wav", "sctter")
+
+
+def synthetic_config(name, groups, per_menu=100):
+    menus = {f"{name}_main": {'label': name.title(), 'items': {'submenus': {'0': []}, 'nodegroups': {}}}}
+    nodegroups = {}
+
+    for menu_index in range(groups // per_menu):
+        menu_idname = f"{name}_{menu_index}"
+        menus[f"{name}_main"]['items']['submenus']['0'].append(menu_idname)
+        menus[menu_idname] = {'label': " ".join(random.sample(WORDS, 2)).title(),
+                              'items': {'submenus': {}, 'nodegroups': {'0': []}}}
+
+        for index in range(per_menu):
+            item_key = f"{menu_idname}_{index}"
+            label = " ".join(random.sample(WORDS, 3)).title()
+            nodegroups[item_key] = {'label': label, 'node_tree': f"{label.replace(' ', '_')}_{index}"}
+            menus[menu_idname]['items']['nodegroups']['0'].append(item_key)
+
+    return {'configs': {'GeometryNodeTree': {'menus': menus, 'nodegroups': nodegroups}}}
+
+
+def main():
+    args = sys.argv[1:]
+    random.seed(0)
+    configs = {f"library_{index}": synthetic_config(f"library_{index}", 5000) for index in range(10)}
+    index = search_index.SearchIndex()
+
+    def build():
+        index.clear()
+        for config, config_dict in configs.items():
+            index.add_config(config, config_dict)
+
+    results = {'entries': sum(len(c['configs']['GeometryNodeTree']['nodegroups']) for c in configs.values())}
+    results['build_ms'] = time_call(build, repeat=3) * 1000
+    results['update_config_ms'] = time_call(lambda: index.add_config("library_0", configs["library_0"]), repeat=10) * 1000
+
+    # a new generation for every call, so the last search cache is never hit
+    def query(text):
+        index.generation += 1
+        index.search(text, 'GeometryNodeTree')
+
+    results['query_ms'] = {text: time_call(lambda: query(text), repeat=50) * 1000 for text in QUERIES}
+    report(results, output=args[0] if args else None)
+
+
+main()
@@ -0,0 +1,91 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_startup.py -- [--sizes 100,1000,10000]
+#            [--libraries 10] [--repeat 5] [--output results.json]
+# Compares menu_generator.register() building from the merged manifest against parsing every per-library config.
+import sys
+import argparse
+import tempfile
+from pathlib import Path
+
+import bpy
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, scratch_preferences, time_call, report
+from synthetic_library import build_library
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_startup.py")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated total nodegroup counts")
+    parser.add_argument("--libraries", type=int, default=10, help="library files the nodegroups are split over")
+    parser.add_argument("--repeat", type=int, default=5, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def bench_size(addon, folder, size, args):
+    menu_generator = addon.menu_generator
+    manifest = addon.manifest
+
+    for index in range(args.libraries):
+        build_library(folder / f"synthetic_{index}.blend", size // args.libraries)
+        addon.config_builder.generate_library_config(folder=folder, force=True)
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+    def register_from(use_manifest):
+        def run():
+            menu_generator.unregister()
+            menu_generator.config_store.clear()
+            if not use_manifest:
+                manifest.manifest_path(folder).unlink()
+            menu_generator.register()
+        return run
+
+    # each fallback run writes the manifest again, which the next manifest run then reads
+    register_per_file = register_manifest = 0.0
+    for _ in range(args.repeat):
+        register_per_file += time_call(register_from(False), repeat=1)
+        register_manifest += time_call(register_from(True), repeat=1)
+
+    paths = menu_generator.config_store.paths()
+
+    def parse_per_file():
+        menu_generator.config_store.clear()
+        for config_dict in menu_generator.config_store.configs().values():
+            manifest.config_signatures(config_dict)
+
+    results = {
+        'menus': len(menu_generator.menu_specs),
+        'manifest_bytes': manifest.manifest_path(folder).stat().st_size,
+        'config_bytes': sum(path.stat().st_size for path in paths),
+        'register_per_file_ms': register_per_file / args.repeat * 1000,
+        'register_manifest_ms': register_manifest / args.repeat * 1000,
+        'parse_per_file_ms': time_call(parse_per_file, repeat=args.repeat) * 1000,
+        'load_manifest_ms': time_call(lambda: manifest.load_manifest(folder, paths), repeat=args.repeat) * 1000,
+    }
+
+    menu_generator.unregister()
+    for path in (*paths, manifest.manifest_path(folder)):
+        path.unlink()
+    return results
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    menu_generator = addon.menu_generator
+
+    menu_generator.unregister()
+    folder = Path(tempfile.mkdtemp())
+    menu_generator.config_folder = folder
+    menu_generator.config_store = addon.config_store.ConfigStore(folder)
+
+    results = {'blender': bpy.app.version_string, 'libraries': args.libraries, 'repeat': args.repeat, 'sizes': {}}
+    # with no entries every config in the folder is loaded, instead of only the user's libraries
+    with scratch_preferences(addon):
+        for size in (int(size) for size in args.sizes.split(",")):
+            results['sizes'][str(size)] = bench_size(addon, folder, size, args)
+
+    report(results, output=args.output)
+
+
+main()
@@ -0,0 +1,102 @@
+# Usage: blender -b --factory-startup --python benchmarks/bench_tree_dispatch.py -- [--libraries 20]
+#            [--submenus 10] [--groups 20] [--repeat 200] [--output results.json]
+# Times drawing the User Library menu in a geometry node editor and polling every menu class, as libraries for
+# more tree types are loaded alongside the geometry ones.
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from common import script_args, enable_addon, time_call, report, StubLayout
+
+tree_types = {'GeometryNodeTree': "GB", 'ShaderNodeTree': "SB", 'CompositorNodeTree': "CB", 'TextureNodeTree': "TB"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="bench_tree_dispatch.py")
+    parser.add_argument("--libraries", type=int, default=20, help="libraries per tree type")
+    parser.add_argument("--submenus", type=int, default=10, help="submenus of every main menu")
+    parser.add_argument("--groups", type=int, default=20, help="nodegroups per submenu")
+    parser.add_argument("--repeat", type=int, default=200, help="runs averaged for each measurement")
+    parser.add_argument("--output", help="file the JSON results are written to")
+    return parser.parse_args(script_args())
+
+
+def library_config(tree_type, library, args):
+    prefix = f"{tree_types[tree_type]}_L{library}"
+    menus = {}
+    nodegroups = {}
+    submenu_idnames = []
+
+    for submenu in range(args.submenus):
+        item_keys = []
+        for group in range(args.groups):
+            item_key = f"{prefix}_S{submenu}_G{group}"
+            nodegroups[item_key] = {'label': item_key, 'node_tree': item_key, 'icon': 'NONE', 'width': 140.0}
+            item_keys.append(item_key)
+
+        submenu_idname = f"NODE_MT_{prefix}_S{submenu}"
+        menus[submenu_idname] = {
+            'label': f"Submenu {submenu}", 'icon': 'NONE', 'is_expandable': False,
+            'items': {'submenus': {}, 'nodegroups': {"0": item_keys}}}
+        submenu_idnames.append(submenu_idname)
+
+    menus[f"NODE_MT_{prefix}_main"] = {
+        'label': f"Library {library}", 'icon': 'NONE', 'is_expandable': True,
+        'items': {'submenus': {"null": submenu_idnames}, 'nodegroups': {}}}
+
+    data_dict = {'menus': menus, 'nodegroups': nodegroups}
+    return {'filepath': f"//{prefix}.blend", 'configs': {tree_type: data_dict}}
+
+
+def main():
+    args = parse_args()
+    addon = enable_addon()
+    menu_generator = addon.menu_generator
+    parent_menu = menu_generator.NODE_MT_nodegroup_library
+
+    # the synthetic configs aren't entries in the preferences, so they are ordered as loaded
+    ordered_configs = menu_generator.ordered_configs
+    loaded = []
+    menu_generator.ordered_configs = lambda: list(loaded)
+
+    space = type("StubSpace", (), {"tree_type": 'GeometryNodeTree', "node_tree": object()})()
+    context = type("StubContext", (), {"space_data": space})()
+
+    def draw_parent():
+        layout = StubLayout()
+        parent_menu.draw(type("StubMenu", (), {"layout": layout})(), context)
+        return layout.calls
+
+    def poll_all():
+        for menu_class in menu_generator.menu_classes.values():
+            menu_class.poll(context)
+
+    results = {'libraries_per_tree': args.libraries, 'tree_types': {}}
+    for count, tree_type in enumerate(tree_types, start=1):
+        for library in range(args.libraries):
+            config = Path(f"{tree_type}_{library}.json")
+            menu_generator.make_menus(config, library_config(tree_type, library, args))
+            loaded.append(config)
+        parent_menu.set_valid_nodetrees()
+        menu_generator.order_main_menus()
+
+        results['tree_types'][str(count)] = {
+            'menu_classes': len(menu_generator.menu_classes),
+            'parent_draw_calls': draw_parent(),
+            'parent_draw_us': time_call(draw_parent, repeat=args.repeat) * 1e6,
+            'parent_poll_us': time_call(lambda: parent_menu.poll(context), repeat=args.repeat) * 1e6,
+            'poll_all_ms': time_call(poll_all, repeat=max(args.repeat // 20, 1)) * 1000,
+        }
+
+    for config in loaded:
+        menu_generator.unload_config(config)
+    loaded.clear()
+    menu_generator.ordered_configs = ordered_configs
+    parent_menu.set_valid_nodetrees()
+    menu_generator.order_main_menus()
+
+    report(results, output=args.output)
+
+
+main()
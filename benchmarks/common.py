@@ -0,0 +1,75 @@
+import sys
+import json
+import time
+import tempfile
+import importlib
+from pathlib import Path
+from contextlib import contextmanager
+
+ADDON_NAME = Path(__file__).resolve().parent.parent.name
+
+
+def script_args():
+    # blender passes everything after "--" through to the script
+    argv = sys.argv
+    return argv[argv.index("--") + 1:] if "--" in argv else []
+
+
+def enable_addon():
+    import addon_utils
+
+    addon_utils.enable(ADDON_NAME, default_set=True)
+    return importlib.import_module(ADDON_NAME)
+
+
+@contextmanager
+def scratch_preferences(addon):
+    """Empties entry_list, so every config is loaded, with preference writes going to a temporary file.
+
+    The user's preferences are restored in full afterwards.
+    """
+    import bpy
+
+    prefs_handler = addon.prefs_handler
+    prefs = bpy.context.preferences.addons[addon.__name__].preferences
+    saved_dict = prefs_handler.serialize(prefs, prefs_handler.rna_schema(prefs.bl_rna))
+    saved_cache_path = prefs_handler.cache_path
+    prefs_handler.cache_path = Path(tempfile.mkdtemp()) / "userprefs.json"
+
+    with addon.menu_generator.deferred_sync():
+        prefs.entry_list.clear()
+    try:
+        yield prefs
+    finally:
+        prefs_handler.apply_preferences(saved_dict)
+        prefs_handler.flush_pref_cache()
+        prefs_handler.cache_path = saved_cache_path
+
+
+def time_call(func, repeat=1000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def report(results, output=None):
+    text = json.dumps(results, indent=4)
+    print(text)
+
+    if output is not None:
+        with open(output, "w") as fp:
+            fp.write(text)
+
+
+class StubLayout:
+    """Stands in for a UILayout in background mode, accepting every call and property a menu draw makes."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls += 1
+            return self
+        return call
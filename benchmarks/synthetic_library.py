@@ -0,0 +1,49 @@
+# Builds synthetic library .blend files laid out the way config_builder expects, for the benchmarks.
+# Only usable inside Blender.
+import bpy
+
+LAYOUT_NAME = "Nodegroup Library"
+BASE_NAME = "Synthetic_Base"
+
+
+def group_name(index):
+    return f"Synthetic_{index:05}"
+
+
+def build_frames(tree, depth, fanout):
+    """Nests frames depth levels deep with fanout frames per parent, returning the innermost ones."""
+    leaves = [None]
+
+    for level in range(depth):
+        parents, leaves = leaves, []
+        for parent_index, parent in enumerate(parents):
+            for index in range(fanout):
+                frame = tree.nodes.new("NodeFrame")
+                frame.label = f"Category {level}.{parent_index * fanout + index}"
+                frame.parent = parent
+                leaves.append(frame)
+
+    return leaves
+
+
+def build_library(filepath, group_count, depth=2, fanout=4):
+    """Saves an empty file holding a geometry nodes library of group_count nodegroups to filepath.
+
+    Every nodegroup uses one shared base group, so appends and configs have a dependency to deal with.
+    """
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+    base = bpy.data.node_groups.new(BASE_NAME, 'GeometryNodeTree')
+    tree = bpy.data.node_groups.new(LAYOUT_NAME, 'GeometryNodeTree')
+    leaves = build_frames(tree, depth, fanout)
+
+    for index in range(group_count):
+        group = bpy.data.node_groups.new(group_name(index), 'GeometryNodeTree')
+        group.nodes.new("GeometryNodeGroup").node_tree = base
+
+        node = tree.nodes.new("GeometryNodeGroup")
+        node.node_tree = group
+        node.parent = leaves[index % len(leaves)]
+
+    bpy.ops.wm.save_as_mainfile(filepath=str(filepath))
+    return filepath
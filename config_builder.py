@@ -0,0 +1,487 @@
+import bpy
+import json
+import time
+import hashlib
+from pathlib import Path
+from .global_data import icon_list
+from .manifest import update_manifest
+
+config_folder = Path(__file__).parent / "menu_configs"
+
+# bump whenever generation changes in a way that should invalidate stored fingerprints
+FINGERPRINT_VERSION = 5
+
+PROPERTY_FRAME_COLOR = (0.0, 1.0, 1.0)
+tree_prefixes = {
+    "GeometryNodeTree": "GEO",
+    "ShaderNodeTree": "SHAD",
+    "CompositorNodeTree": "COMP",
+    "TextureNodeTree": "TEX",
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def fetch_nodetrees():
+    data = bpy.data
+    nodetrees = []
+
+    # ===== COMPOSITOR NODETREE =====
+    scene = data.scenes.get('Nodegroup Library')
+    if hasattr(scene, "node_tree") and (scene.node_tree is not None):
+        compositor_tree = scene.node_tree
+        nodetrees.append(compositor_tree)
+
+    # ===== SHADER NODETREE =====
+    material = data.materials.get('Nodegroup Library')
+    if hasattr(material, "node_tree") and (material.node_tree is not None):
+        shader_tree = material.node_tree
+        nodetrees.append(shader_tree)
+
+    # ===== GEOMETRY NODETREE =====
+    nodegroup = data.node_groups.get('Nodegroup Library')
+    if hasattr(nodegroup, 'bl_idname'):
+        if nodegroup.bl_idname == 'GeometryNodeTree':
+            geonodes_tree = nodegroup
+            nodetrees.append(geonodes_tree)
+        else:
+            raise Exception("Nodegroup that isn't of type GeometryNodeTree is named 'Nodegroup Library'")
+
+    # ===== TEXTURE NODETREE =====
+    texture = data.textures.get('Nodegroup Library')
+    if hasattr(texture, 'node_tree'):
+        if hasattr(texture.node_tree, "nodes") and (texture.node_tree is not None):
+            texture_nodes_tree = texture.node_tree
+            nodetrees.append(texture_nodes_tree)
+
+    return nodetrees
+
+
+def dependency_closure(node_tree, closures):
+    """Sorted names of every nodegroup that node_tree uses, directly or through other nodegroups."""
+    closure = closures.get(node_tree.name)
+    if closure is not None:
+        return closure
+
+    dependencies = set()
+    for node in node_tree.nodes:
+        if node.type == 'GROUP' and node.node_tree is not None:
+            dependencies.add(node.node_tree.name)
+            dependencies.update(dependency_closure(node.node_tree, closures))
+
+    closures[node_tree.name] = closure = tuple(sorted(dependencies))
+    return closure
+
+
+class NodeTreeIndex:
+    """Everything config generation reads from a nodetree, gathered in a single pass over its nodes."""
+
+    def __init__(self, nodetree, closures=None):
+        closures = {} if closures is None else closures
+        self.tree_type = nodetree.bl_idname
+        self.prefix = tree_prefixes.get(self.tree_type, "NULL")
+
+        self.nodes = {}
+        self.parents = {}
+        self.labels = {}
+        self.widths = {}
+        self.node_trees = {}
+        self.dependencies = {}
+        self.idnames = {}
+
+        self.frames = []
+        self.prop_frames = []
+        self.groups = []
+        self.variables = []
+        self.property_frames = set()
+
+        for node in nodetree.nodes:
+            node_type = node.bl_label
+            if node_type not in ('Frame', 'Group', 'Value'):
+                continue
+
+            name = node.name
+            parent = node.parent
+            self.nodes[name] = node
+            self.parents[name] = parent.name if parent is not None else None
+            self.labels[name] = node.label
+
+            if node_type == 'Frame':
+                if node.use_custom_color and tuple(node.color) == PROPERTY_FRAME_COLOR:
+                    self.prop_frames.append(name)
+                    self.property_frames.add(name)
+                else:
+                    self.frames.append(name)
+
+            elif node_type == 'Group':
+                node_tree = node.node_tree
+                self.groups.append(name)
+                self.widths[name] = node.width
+                self.node_trees[name] = node_tree.name if node_tree is not None else None
+                self.dependencies[name] = dependency_closure(node_tree, closures) if node_tree is not None else ()
+
+            elif node.mute is False:
+                self.variables.append(name)
+
+    def has_items(self):
+        return bool(self.groups or self.frames or self.prop_frames)
+
+    def is_property_frame(self, name):
+        return name in self.property_frames
+
+    def idname(self, name, name_hash):
+        idname = self.idnames.get(name)
+        if idname is None:
+            idname = self.idnames[name] = name_hash(name, self.prefix)
+        return idname
+
+    def fingerprint_fields(self):
+        for name in self.frames:
+            yield ('Frame', name, self.labels[name], self.parents[name], False)
+        for name in self.prop_frames:
+            yield ('Frame', name, self.labels[name], self.parents[name], True)
+        for name in self.variables:
+            # labels are fingerprinted as generation tidies them, whether or not the tidied label was saved yet
+            tidied = tidy_variable(self.labels[name])
+            label = self.labels[name] if tidied is None else "{}: {}".format(*tidied)
+            yield ('Value', name, label, self.parents[name])
+        for name in self.groups:
+            yield ('Group', name, self.labels[name], self.parents[name], self.widths[name], self.node_trees[name],
+                   self.dependencies[name])
+
+
+def tidy_variable(label):
+    """(var_name, value) of a valid ICON or GROUP_INDEX label as generation normalizes it, None for any other label."""
+    data = label.strip().split(":")
+    if len(data) != 2:
+        return None
+
+    var_name, value = (value.strip() for value in data)
+    if var_name == 'ICON':
+        value = value.replace("'", "").replace('"', '').upper()
+        return (var_name, value) if value in icon_list else None
+    if var_name == 'GROUP_INDEX' and value.isdigit():
+        return var_name, int(value)
+    return None
+
+
+def tidy_variable_node(index, name, var_name, value):
+    node = index.nodes[name]
+    node.label = index.labels[name] = f"{var_name}: {value}"
+    node.show_options = False
+    for socket in node.outputs:
+        socket.hide = True
+
+
+def tidy_variable_nodes(indexes=None):
+    """Tidies variable nodes in the open file, for when its config is generated by a background Blender."""
+    for index in build_indexes() if indexes is None else indexes:
+        for name in index.variables:
+            tidied = tidy_variable(index.labels[name])
+            if tidied is None:
+                continue
+
+            # nodes that are already tidy are left alone, so the file isn't marked as changed on every save
+            node = index.nodes[name]
+            is_tidy = node.label == "{}: {}".format(*tidied) and not node.show_options
+            if not is_tidy or any(not socket.hide for socket in node.outputs):
+                tidy_variable_node(index, name, *tidied)
+
+
+def fingerprint_indexes(filepath, indexes):
+    # covers only what generation reads: frame hierarchy, labels, colors, variable nodes, group nodes and widths
+    digest = hashlib.blake2b(f"{FINGERPRINT_VERSION}{filepath}".encode(), digest_size=16)
+
+    for index in indexes:
+        digest.update(index.tree_type.encode())
+        for fields in index.fingerprint_fields():
+            digest.update(repr(fields).encode())
+
+    return digest.hexdigest()
+
+
+def config_path(filepath, folder=None):
+    folder = config_folder if folder is None else Path(folder)
+    return folder / f"{Path(filepath).stem}.json"
+
+
+def fingerprint_path(cache_path):
+    return cache_path.with_suffix(".fingerprint")
+
+
+def read_fingerprint(cache_path):
+    try:
+        return fingerprint_path(cache_path).read_text()
+    except FileNotFoundError:
+        return None
+
+
+def is_up_to_date(cache_path, fingerprint):
+    return cache_path.exists() and read_fingerprint(cache_path) == fingerprint
+
+
+def diff_configs(old_config, new_config):
+    def flatten(config):
+        return {(tree, section, key): value
+                for tree, data_dict in config['configs'].items()
+                for section in ('menus', 'nodegroups')
+                for key, value in data_dict[section].items()}
+
+    # round-trip through JSON so both sides use the same key types
+    old_items = flatten(json.loads(json.dumps(old_config)))
+    new_items = flatten(json.loads(json.dumps(new_config)))
+
+    return {
+        'added': len(new_items.keys() - old_items.keys()),
+        'removed': len(old_items.keys() - new_items.keys()),
+        'changed': sum(1 for key in new_items.keys() & old_items.keys() if new_items[key] != old_items[key]),
+    }
+
+
+def build_indexes():
+    # closures are shared, nodegroups used by several layout trees are only walked once
+    closures = {}
+    return [NodeTreeIndex(tree, closures) for tree in fetch_nodetrees()]
+
+
+def build_config(filepath=None, normalize=True, indexes=None):
+    filepath = Path(bpy.data.filepath if filepath is None else filepath)
+    indexes = build_indexes() if indexes is None else indexes
+
+    main_name = filepath.name.removesuffix(".blend")
+    abbr = "".join(chars[0] for chars in main_name.replace(" ", "_").split("_")[:10])
+
+    def name_hash(menu_name, prefix):
+        # built-in hash() is salted per session, so idnames would change on every restart
+        hashed_name = hashlib.blake2b(f'{main_name}{menu_name}'.encode(), digest_size=8).hexdigest()
+        return generate_idname(hashed_name, prefix)
+
+    def generate_idname(name, prefix):
+        return f'NODEGROUP_LIBRARY_MT_{abbr}_{prefix.upper()}_{name}'
+
+    # libraries sharing initials would otherwise share a main menu, so it's told apart by the library's path
+    main_hash = hashlib.blake2b(str(filepath).encode(), digest_size=8).hexdigest()
+
+    supported_variables = {
+        'ICON': "string",
+        'GROUP_INDEX': "int",
+        'SORT_INDEX': "int",
+    }
+
+    # ===== MENUS=====
+    def generate_config(index):
+        main = generate_idname(f"{main_hash}_main", index.prefix)
+        parents = index.parents
+        labels = index.labels
+
+        def idname(name):
+            return index.idname(name, name_hash) if name is not None else None
+
+        nodegroups = {}
+        menus = {
+            main: {
+                'label': main_name,
+                'items': {'submenus': [], 'nodegroups': []},
+            }
+        }
+        property_frames = {}
+
+        for name in index.prop_frames:
+            if index.is_property_frame(parents[name]):
+                error_message = f"PropertyFrame cannot be nested inside another PropertyFrame. \nError at: '{labels[name]}' - {index.nodes[name]}"
+                raise ConfigError(error_message)
+
+            property_frames[idname(name)] = {}
+
+        for name in index.frames:
+            menu_name = idname(name)
+            parent = idname(parents[name])
+
+            menus[menu_name] = {
+                'label': labels[name],
+                'items': {'submenus': [], 'nodegroups': []},
+            }
+
+            if parent is not None:
+                menus[parent]['items']['submenus'].append(menu_name)
+            else:
+                menus[main]['items']['submenus'].append(menu_name)
+
+        for name in index.variables:
+            label = labels[name]
+            node = index.nodes[name]
+
+            data = label.strip().split(":")
+            if len(data) != 2:
+                error_message = f"Invalid variable data, labels should contain exactly one semicolon. \nError at: '{label}' - {node}"
+                raise ConfigError(error_message)
+            var_name, value = (value.strip() for value in data)
+
+            var_type = supported_variables.get(var_name)
+            if var_type is None:
+                error_message = f"'{var_name}' is not a valid variable name. \nError at: '{label}' - {node}"
+                raise ConfigError(error_message)
+
+            if var_name == 'ICON':
+                value = value.strip().replace("'", "").replace('"', '').upper()
+                if value not in icon_list:
+                    error_message = f"'{value}' is not a valid icon name. \nError at: '{label}' - {node}"
+                    raise ConfigError(error_message)
+
+                if normalize:
+                    tidy_variable_node(index, name, var_name, value)
+
+            elif var_name == 'GROUP_INDEX':
+                if not value.isdigit():
+                    error_message = f"GROUP_INDEX '{value}' is not a non-negative integer. \nError at: '{label}' - {node}"
+                    raise ConfigError(error_message)
+                else:
+                    value = int(value)
+                    if normalize:
+                        tidy_variable_node(index, name, var_name, value)
+
+            parent = idname(parents[name]) or main
+            var_lookup = var_name.strip().lower().replace(" ", "_")
+
+            if not index.is_property_frame(parents[name]):
+                variable = menus[parent].get(var_lookup)
+                if variable is not None:
+                    error_message = f"Variable '{var_name}' has been defined multiple times for menu {parent}. \nError at: '{label}' - {node}"
+                    raise ConfigError(error_message)
+                menus[parent][var_lookup] = value
+            else:
+                variable = property_frames[parent].get(var_lookup)
+                if variable is not None:
+                    error_message = f"Variable '{var_name}' has been defined multiple times for property frame {parent}. \nError at: '{label}' - {node}"
+                    raise ConfigError(error_message)
+
+                property_frames[parent][var_lookup] = value
+
+        for name in index.groups:
+            if index.node_trees[name] is None:
+                error_message = f"Group node has no nodegroup assigned. \nError at: '{labels[name]}' - {index.nodes[name]}"
+                raise ConfigError(error_message)
+
+            parent_name = parents[name]
+            parent = idname(parent_name)
+
+            extra_data = {}
+            if index.is_property_frame(parent_name):
+                extra_data = property_frames[parent]
+                parent = idname(parents[parent_name])
+
+            default_data = {
+                'label': labels[name],
+                'width': index.widths[name],
+                'node_tree': index.node_trees[name],
+                'dependencies': list(index.dependencies[name]),
+            }
+
+            group_name = idname(name)
+            nodegroups[group_name] = default_data | extra_data
+
+            if parent is not None:
+                menus[parent]['items']['nodegroups'].append(group_name)
+            else:
+                menus[main]['items']['nodegroups'].append(group_name)
+
+        for value in menus.values():
+            does_children_have_submenu = list(len(menus[submenu]['items']['submenus']) == 0 for submenu in value['items']['submenus'])
+            is_expandable = all(does_children_have_submenu) and len(does_children_have_submenu) != 0
+            value['is_expandable'] = is_expandable
+            submenus = value['items']['submenus']
+            groups = value['items']['nodegroups']
+
+            submenu_dict = {}
+            nodegroup_dict = {}
+
+            submenus.sort(key=lambda _: menus[_]['label'])
+            groups.sort(key=lambda _: nodegroups[_]['node_tree'])
+
+            for submenu in submenus:
+                group_index = menus[submenu].get('group_index', None)
+                group_index_val = submenu_dict.get(group_index)
+
+                if group_index_val is None:
+                    submenu_dict[group_index] = [submenu, ]
+                else:
+                    group_index_val.append(submenu)
+
+            sorted_dict = {i: submenu_dict[i] for i in sorted(submenu_dict, key=lambda _: str(_))}
+
+            for group in groups:
+                group_index = nodegroups[group].get('group_index', None)
+                group_index_val = nodegroup_dict.get(group_index)
+
+                if group_index_val is None:
+                    nodegroup_dict[group_index] = [group, ]
+                else:
+                    group_index_val.append(group)
+
+            sorted_nodegroup_dict = {i: nodegroup_dict[i] for i in sorted(nodegroup_dict, key=lambda _: str(_))}
+
+            value['items']['submenus'] = sorted_dict
+            value['items']['nodegroups'] = sorted_nodegroup_dict
+
+        return index.tree_type, menus, nodegroups
+
+    tree_configs = {}
+    for index in indexes:
+        if index.has_items():
+            tree_type, menus, nodegroups = generate_config(index)
+            tree_configs[tree_type] = {'menus': menus, 'nodegroups': nodegroups}
+
+    output = {'filepath': str(filepath), 'configs': tree_configs}
+    return output
+
+
+def write_config(output, folder=None):
+    cache_path = config_path(output['filepath'], folder)
+
+    with open(cache_path, "w") as fp:
+        json.dump(output, fp=fp, indent=4)
+
+    return cache_path
+
+
+def generate_library_config(folder=None, purge=True, force=False):
+    filepath = Path(bpy.data.filepath)
+    cache_path = config_path(filepath, folder)
+    indexes = build_indexes()
+
+    if not force and is_up_to_date(cache_path, fingerprint_indexes(filepath, indexes)):
+        return cache_path, False
+
+    if purge:
+        bpy.ops.outliner.orphans_purge(do_recursive=True)
+        # purging can free nodes the index still points at
+        indexes = build_indexes()
+
+    write_config(build_config(filepath, indexes=indexes), folder=folder)
+    update_manifest(cache_path.parent, cache_path)
+
+    # taken after the purge, which can drop nodegroups the dependency closures pointed at
+    fingerprint_path(cache_path).write_text(fingerprint_indexes(filepath, indexes))
+    return cache_path, True
+
+
+def preview_library_config(folder=None):
+    filepath = Path(bpy.data.filepath)
+    cache_path = config_path(filepath, folder)
+    start = time.perf_counter()
+    indexes = build_indexes()
+
+    if is_up_to_date(cache_path, fingerprint_indexes(filepath, indexes)):
+        return None, time.perf_counter() - start
+
+    output = build_config(filepath, normalize=False, indexes=indexes)
+    elapsed = time.perf_counter() - start
+
+    old_config = {'configs': {}}
+    if cache_path.exists():
+        with open(cache_path, "r") as f:
+            old_config = json.loads(f.read())
+
+    return diff_configs(old_config, output), elapsed
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+from .perf_stats import stats
+
+
+class ConfigStore:
+    """Parses each menu config once, caching the result by path, mtime and size."""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self._cache = {}
+
+    def paths(self):
+        # globbed on every call so that configs written after import are picked up
+        return sorted(self.folder.glob("*.json"))
+
+    def get(self, path):
+        path = Path(path)
+
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._cache.pop(path, None)
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(path)
+
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with stats.timed("Config Parse"), open(path, "r") as f:
+            config_dict = json.loads(f.read())
+
+        self._cache[path] = (key, config_dict)
+        return config_dict
+
+    def prime(self, path, key, config_dict):
+        """Caches a config read from elsewhere, such as the manifest, under the stat key it was read at."""
+        self._cache[Path(path)] = (tuple(key), config_dict)
+
+    def configs(self):
+        configs = {}
+
+        for path in self.paths():
+            config_dict = self.get(path)
+            if config_dict is not None:
+                configs[path] = config_dict
+
+        for path in self._cache.keys() - configs.keys():
+            del self._cache[path]
+
+        return configs
+
+    def clear(self):
+        self._cache.clear()
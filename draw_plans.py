@@ -0,0 +1,172 @@
+from .operators import NODE_OT_NODEGROUP_LIBRARY_append_group as append_nodegroup
+from .operators import NODE_OT_NODEGROUP_LIBRARY_append_batch as append_batch
+from .pref_snapshot import snapshot
+
+spacing = 0.65
+default_menu_text = "unnamed_menu"
+max_page_label = 16
+
+# draw instructions are plain tuples, the first element being one of these opcodes
+OPERATOR, SEPARATOR, LAYOUT_SEPARATOR, MENU, ROW, COLUMN, LABEL, CONTENTS, CATEGORY, PAGE = range(10)
+
+
+def nodegroup_label(nodegroup_data):
+    label = nodegroup_data['label']
+    return label if label != '' else nodegroup_data['node_tree']
+
+
+def operator_instruction(item_key, nodegroup_data, available=None):
+    # available is the cataloged set of nodegroup names in the library file, None when it isn't known yet
+    is_missing = available is not None and nodegroup_data['node_tree'] not in available
+    return (OPERATOR, nodegroup_label(nodegroup_data), nodegroup_data.get("icon", 'NONE'), item_key, is_missing)
+
+
+def short_label(label):
+    return label if len(label) <= max_page_label else f"{label[:max_page_label - 1]}…"
+
+
+def paginate(menu_idname, data, data_dict, page_size, by_label=True):
+    """Splits the nodegroups of a category into (idname, label, item_keys) pages, or () when they fit in one menu."""
+    item_keys = [key for group in data['items']['nodegroups'].values() for key in group]
+    if page_size <= 0 or len(item_keys) <= page_size:
+        return ()
+
+    nodegroups = data_dict['nodegroups']
+    if by_label:
+        item_keys.sort(key=lambda key: nodegroup_label(nodegroups[key]).casefold())
+
+    pages = []
+    for number, start in enumerate(range(0, len(item_keys), page_size)):
+        page_keys = tuple(item_keys[start:start + page_size])
+        if by_label:
+            first, last = (short_label(nodegroup_label(nodegroups[key])) for key in (page_keys[0], page_keys[-1]))
+            label = f"{first} – {last}"
+        else:
+            label = f"{start + 1} – {start + len(page_keys)}"
+        # main menu idnames leave only a few of the 63 characters Blender allows in an idname
+        pages.append((f"{menu_idname}_{number}", label, page_keys))
+
+    return tuple(pages)
+
+
+def compile_page(page_keys, data_dict, available=None):
+    nodegroups = data_dict['nodegroups']
+    return tuple(operator_instruction(key, nodegroups[key], available) for key in page_keys)
+
+
+def nodegroup_instructions(data, data_dict, pages, available, separator):
+    # a paged category lists its pages where its nodegroups would otherwise be
+    if pages:
+        return [(PAGE, page_idname, label) for page_idname, label, _ in pages]
+
+    nodegroups = data_dict['nodegroups']
+    plan = []
+    for group in data['items']['nodegroups'].values():
+        plan.append(separator)
+        for nodegroup in group:
+            plan.append(operator_instruction(nodegroup, nodegroups[nodegroup], available))
+    return plan
+
+
+def category_instructions(menu_idname, data):
+    # a single nodegroup and nothing below it isn't worth a batch button
+    submenu_groups = data['items']['submenus']
+    item_count = sum(len(group) for group in data['items']['nodegroups'].values())
+
+    if not submenu_groups and item_count < 2:
+        return []
+    return [(LAYOUT_SEPARATOR,), (CATEGORY, "Append All", menu_idname)]
+
+
+def compile_compact(menu_idname, data, data_dict, available=None, pages=()):
+    submenu_groups = data['items']['submenus']
+    nodegroup_items = data['items']['nodegroups']
+    menus = data_dict['menus']
+    plan = []
+
+    for group in submenu_groups.values():
+        plan.append((SEPARATOR,))
+        for submenu_idname in group:
+            plan.append((MENU, submenu_idname, menus[submenu_idname].get('icon', 'NONE')))
+
+    if submenu_groups and nodegroup_items:
+        plan.append((SEPARATOR,))
+
+    plan.extend(nodegroup_instructions(data, data_dict, pages, available, (SEPARATOR,)))
+    plan.extend(category_instructions(menu_idname, data))
+    return tuple(plan)
+
+
+def compile_expanded(menu_idname, data, data_dict, hide_empty_headers, available=None, pages=()):
+    submenu_groups = data['items']['submenus']
+    nodegroup_items = data['items']['nodegroups']
+    menus = data_dict['menus']
+    plan = [(ROW,)]
+
+    for group_index, group in submenu_groups.items():
+        if group_index != "null":
+            plan.append((COLUMN,))
+
+        for index, submenu_idname in enumerate(group):
+            submenu_data = menus[submenu_idname]
+
+            if group_index == "null":
+                plan.append((COLUMN,))
+            elif index > 0:
+                plan.append((SEPARATOR,))
+
+            label = submenu_data['label']
+            icon = submenu_data.get('icon', 'NONE')
+            if label != '' or icon != 'NONE' or not hide_empty_headers:
+                text = label if label != '' else default_menu_text
+                plan.append((LABEL, text, icon))
+                plan.append((SEPARATOR,))
+
+            plan.append((CONTENTS, submenu_idname))
+
+    if not nodegroup_items:
+        plan.extend(category_instructions(menu_idname, data))
+        return tuple(plan)
+
+    plan.append((COLUMN,))
+    if submenu_groups:
+        plan.append((LABEL, "Misc.", 'NONE'))
+        plan.append((SEPARATOR,))
+
+    plan.extend(nodegroup_instructions(data, data_dict, pages, available, (LAYOUT_SEPARATOR,)))
+    plan.extend(category_instructions(menu_idname, data))
+    return tuple(plan)
+
+
+def run_plan(layout, plan):
+    target = row = layout
+    operator_idname = append_nodegroup.bl_idname
+
+    for instruction in plan:
+        opcode = instruction[0]
+
+        if opcode == OPERATOR:
+            if not instruction[4]:
+                target.operator(operator_idname, text=instruction[1], icon=instruction[2]).item_key = instruction[3]
+            elif snapshot.missing_groups == 'GREY':
+                sub = target.row()
+                sub.enabled = False
+                sub.operator(operator_idname, text=instruction[1], icon=instruction[2]).item_key = instruction[3]
+        elif opcode == SEPARATOR:
+            target.separator(factor=spacing)
+        elif opcode == LAYOUT_SEPARATOR:
+            layout.separator(factor=spacing)
+        elif opcode == MENU:
+            target.menu(instruction[1], icon=instruction[2])
+        elif opcode == ROW:
+            row = layout.row()
+        elif opcode == COLUMN:
+            target = row.column()
+        elif opcode == LABEL:
+            target.label(text=instruction[1], icon=instruction[2])
+        elif opcode == CONTENTS:
+            target.menu_contents(instruction[1])
+        elif opcode == CATEGORY:
+            layout.operator(append_batch.bl_idname, text=instruction[1], icon='ADD').category = instruction[2]
+        elif opcode == PAGE:
+            target.menu(instruction[1], text=instruction[2])
@@ -0,0 +1,388 @@
+"""Regenerates menu configs for library .blend files in a pool of background Blender processes.
+
+Usage:
+    python headless.py [PATHS ...] [--prefs] [--blender PATH] [--jobs N] [--output FOLDER] [--health]
+
+PATHS can be .blend files or folders containing them, and defaults to the add-on's blendfiles/ folder.
+--prefs adds every enabled entry from the add-on's saved preferences (userprefs.json).
+--health checks each library against its config instead, skipping files unchanged since their last check.
+"""
+import os
+import sys
+import json
+import types
+import tempfile
+import time
+import argparse
+import importlib
+import subprocess
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+ADDON_FOLDER = Path(__file__).resolve().parent
+WORKER_FLAG = "--nodegroup-library-worker"
+RESULT_PREFIX = "NODEGROUP_LIBRARY_RESULT:"
+
+default_blendfolder = ADDON_FOLDER / "blendfiles"
+default_output = ADDON_FOLDER / "menu_configs"
+prefs_cache = ADDON_FOLDER / "userprefs.json"
+health_cache_path = ADDON_FOLDER / "health_cache.json"
+
+
+def collect_blendfiles(paths):
+    filepaths = []
+
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            filepaths.extend(sorted(path.glob("*.blend")))
+        elif path.suffix == ".blend":
+            filepaths.append(path)
+
+    return filepaths
+
+
+def prefs_blendfiles(cache=prefs_cache):
+    with open(cache, "r") as f:
+        pref_dict = json.loads(f.read())
+
+    return [Path(entry['filepath']) for entry in pref_dict.get('entry_list', []) if entry.get('is_enabled', True)]
+
+
+def unique_paths(filepaths):
+    return list({Path(os.path.abspath(filepath)): None for filepath in filepaths})
+
+
+def worker_command(blender, filepath, mode, output):
+    return [
+        str(blender), "-b", "--factory-startup", str(filepath),
+        "--python", str(Path(__file__).resolve()),
+        "--", WORKER_FLAG, mode, str(output),
+    ]
+
+
+def parse_result(filepath, returncode, stdout, stderr):
+    for line in stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    error = stderr.strip().splitlines()[-1:] or [f"Blender exited with code {returncode}"]
+    return {'filepath': str(filepath), 'ok': False, 'error': error[0]}
+
+
+def run_worker(blender, filepath, mode="compile", output=default_output):
+    process = subprocess.run(worker_command(blender, filepath, mode, output), capture_output=True, text=True)
+    return parse_result(filepath, process.returncode, process.stdout, process.stderr)
+
+
+class WorkerJob:
+    """A worker started without waiting on it, for callers that poll from a timer."""
+
+    def __init__(self, blender, filepath, mode="compile", output=default_output):
+        self.filepath = Path(filepath)
+        self.started = time.perf_counter()
+        self.finished = None
+        # output goes to temporary files, a full pipe would otherwise stall Blender until it is read
+        self.stdout = tempfile.TemporaryFile(mode="w+")
+        self.stderr = tempfile.TemporaryFile(mode="w+")
+        self.process = subprocess.Popen(
+            worker_command(blender, filepath, mode, output), stdout=self.stdout, stderr=self.stderr, text=True)
+
+    def is_running(self):
+        if self.process.poll() is None:
+            return True
+
+        if self.finished is None:
+            self.finished = time.perf_counter()
+        return False
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def result(self):
+        self.process.wait()
+        self.stdout.seek(0)
+        self.stderr.seek(0)
+
+        try:
+            return parse_result(self.filepath, self.process.returncode, self.stdout.read(), self.stderr.read())
+        finally:
+            self.stdout.close()
+            self.stderr.close()
+
+    def cancel(self):
+        self.process.kill()
+        self.process.wait()
+        self.stdout.close()
+        self.stderr.close()
+
+
+class WorkerQueue:
+    """Runs a WorkerJob per filepath, at most jobs at once, for callers that poll from a timer."""
+
+    def __init__(self, blender, filepaths, mode="compile", output=default_output, jobs=None):
+        self.blender = blender
+        self.mode = mode
+        self.output = output
+        self.jobs = jobs or os.cpu_count()
+        self.pending = deque(filepaths)
+        self.running = {}
+        self.start_jobs()
+
+    def add(self, filepath, first=False):
+        """Queues another filepath, ahead of the pending ones when first is set."""
+        if first:
+            self.pending.appendleft(filepath)
+        else:
+            self.pending.append(filepath)
+        self.start_jobs()
+
+    def is_queued(self, filepath):
+        return filepath in self.running or filepath in self.pending
+
+    def is_running(self, filepath):
+        return filepath in self.running
+
+    def start_jobs(self):
+        while self.pending and len(self.running) < self.jobs:
+            filepath = self.pending.popleft()
+            self.running[filepath] = WorkerJob(self.blender, filepath, self.mode, self.output)
+
+    def poll(self):
+        """(filepath, result) of the jobs that finished since the last poll, with new jobs started in their place.
+
+        Each result also holds the seconds its worker ran for under 'elapsed'.
+        """
+        results = []
+        for filepath, job in tuple(self.running.items()):
+            if not job.is_running():
+                del self.running[filepath]
+                result = job.result()
+                result['elapsed'] = job.elapsed()
+                results.append((filepath, result))
+
+        self.start_jobs()
+        return results
+
+    def is_done(self):
+        return not (self.pending or self.running)
+
+    def cancel(self):
+        for job in self.running.values():
+            job.cancel()
+
+        self.pending.clear()
+        self.running.clear()
+
+
+def health_key(filepath, output=default_output):
+    """Modification times and sizes of a library and its config, a check is redone when either changes."""
+    keys = []
+    for path in (Path(filepath), Path(output) / f"{Path(filepath).stem}.json"):
+        try:
+            stat = path.stat()
+            keys.append([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            keys.append(None)
+    return keys
+
+
+def result_issues(result):
+    return result['issues'] if result['ok'] else [f"Couldn't be opened, {result['error']}"]
+
+
+class HealthCache:
+    """Issues found in each library by its last health check, keyed by health_key."""
+
+    def __init__(self, path=health_cache_path):
+        self.path = Path(path)
+        self.entries = {}
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.loads(f.read())
+        except (OSError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        with open(self.path, "w") as fp:
+            json.dump(self.entries, fp=fp, separators=(",", ":"))
+
+    def get(self, filepath, key):
+        entry = self.entries.get(str(filepath))
+        return entry['issues'] if entry is not None and entry['key'] == key else None
+
+    def set(self, filepath, key, issues):
+        self.entries[str(filepath)] = {'key': key, 'issues': issues}
+
+    def split(self, filepaths, output=default_output):
+        """Cached or immediately known issues for filepaths, and the filepaths that need a worker to check."""
+        issues = {}
+        unchecked = []
+
+        for filepath in filepaths:
+            key = health_key(filepath, output)
+            if key[0] is None:
+                issues[filepath] = ["Library file not found"]
+                continue
+
+            cached = self.get(filepath, key)
+            if cached is None:
+                unchecked.append(filepath)
+            else:
+                issues[filepath] = cached
+
+        return issues, unchecked
+
+    def add_result(self, filepath, result, output=default_output):
+        issues = result_issues(result)
+        self.set(filepath, health_key(filepath, output), issues)
+        return issues
+
+
+def run_pool(blender, filepaths, mode="compile", output=default_output, jobs=None):
+    # each worker is a separate Blender process, so threads are enough to keep them all busy
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        return list(pool.map(lambda filepath: run_worker(blender, filepath, mode, output), filepaths))
+
+
+# ===== WORKER (runs inside blender -b) =====
+def load_package():
+    # the add-on folder name isn't necessarily importable, so it is mounted under a fixed name without running __init__
+    name = "nodegroup_library_headless"
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [str(ADDON_FOLDER)]
+        sys.modules[name] = package
+
+    return name
+
+
+def worker_compile(package, filepath, output, force=False):
+    config_builder = importlib.import_module(f"{package}.config_builder")
+    config, changed = config_builder.generate_library_config(folder=output, force=force)
+    return {'config': str(config), 'changed': changed}
+
+
+def worker_validate(package, filepath, output):
+    # opening the file is already done by the time this runs, so only the library tree is left to check
+    config_builder = importlib.import_module(f"{package}.config_builder")
+    tree_types = [nodetree.bl_idname for nodetree in config_builder.fetch_nodetrees()]
+    if not tree_types:
+        raise config_builder.ConfigError("No 'Nodegroup Library' node tree found")
+
+    return {'tree_types': tree_types}
+
+
+def worker_health(package, filepath, output):
+    import bpy
+
+    config_builder = importlib.import_module(f"{package}.config_builder")
+    issues = []
+
+    if tuple(bpy.data.version) > tuple(bpy.app.version):
+        version = ".".join(str(number) for number in bpy.data.version)
+        issues.append(f"Saved by a newer Blender ({version}), some nodes may not load")
+
+    try:
+        with open(config_builder.config_path(filepath, output), "r") as f:
+            config_dict = json.loads(f.read())
+    except (OSError, ValueError):
+        issues.append("No readable menu config, update the JSON files")
+        return {'issues': issues}
+
+    node_trees = {
+        nodegroup['node_tree'] for data_dict in config_dict['configs'].values()
+        for nodegroup in data_dict['nodegroups'].values()}
+    missing = sorted(node_trees - set(bpy.data.node_groups.keys()))
+    if missing:
+        issues.append(f"Config lists {len(missing)} node groups missing from the file: {', '.join(missing[:5])}")
+
+    return {'issues': issues}
+
+
+worker_modes = {
+    "compile": worker_compile,
+    "force": lambda package, filepath, output: worker_compile(package, filepath, output, force=True),
+    "validate": worker_validate,
+    "health": worker_health,
+}
+
+
+def worker_main(args):
+    import bpy
+
+    mode, output = args
+    filepath = bpy.data.filepath
+    result = {'filepath': filepath, 'ok': True}
+
+    try:
+        result |= worker_modes[mode](load_package(), filepath, output)
+    except Exception as error:
+        result |= {'ok': False, 'error': f"{type(error).__name__}: {error}"}
+
+    print(f"{RESULT_PREFIX}{json.dumps(result)}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate nodegroup library menu configs in background Blender processes.")
+    parser.add_argument("paths", nargs="*", type=Path, help=".blend files or folders containing them")
+    parser.add_argument("--prefs", action="store_true", help="include every enabled entry from userprefs.json")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="path to the Blender executable")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="number of Blender processes to run at once")
+    parser.add_argument("--output", type=Path, default=default_output, help="folder the JSON configs are written to")
+    parser.add_argument("--force", action="store_true", help="regenerate configs even if their fingerprint matches")
+    parser.add_argument("--health", action="store_true", help="check libraries against their configs instead of compiling")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or ([] if args.prefs else [default_blendfolder])
+    filepaths = collect_blendfiles(paths)
+    if args.prefs:
+        filepaths += prefs_blendfiles()
+
+    filepaths = unique_paths(filepaths)
+    if not filepaths:
+        parser.error("no .blend files to compile")
+
+    if args.health:
+        return health_main(args, filepaths)
+
+    mode = "force" if args.force else "compile"
+    results = run_pool(args.blender, filepaths, mode, args.output.resolve(), args.jobs)
+
+    for result in results:
+        if result['ok']:
+            status = "OK" if result['changed'] else "UP TO DATE"
+        else:
+            status = f"FAILED - {result['error']}"
+        print(f"{result['filepath']}: {status}")
+
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+def health_main(args, filepaths):
+    output = args.output.resolve()
+    cache = HealthCache().load()
+    issues, unchecked = cache.split(filepaths, output)
+
+    results = run_pool(args.blender, unchecked, "health", output, args.jobs)
+    for filepath, result in zip(unchecked, results):
+        issues[filepath] = cache.add_result(filepath, result, output)
+    cache.save()
+
+    for filepath in filepaths:
+        status = "OK" if not issues[filepath] else "\n    ".join(["ISSUES", *issues[filepath]])
+        print(f"{filepath}: {status}")
+
+    print(f"{len(unchecked)} checked, {len(filepaths) - len(unchecked)} unchanged or missing")
+    return 0 if not any(issues.values()) else 1
+
+
+if __name__ == "__main__":
+    if WORKER_FLAG in sys.argv:
+        worker_main(sys.argv[sys.argv.index(WORKER_FLAG) + 1:])
+    else:
+        sys.exit(main())
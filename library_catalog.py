@@ -0,0 +1,110 @@
+import bpy
+import os
+import json
+from pathlib import Path
+
+catalog_path = Path(__file__).parent / "library_catalog.json"
+
+
+def stat_key(filepath):
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def frozen_names(names):
+    return None if names is None else frozenset(names)
+
+
+def sorted_names(names):
+    return None if names is None else sorted(names)
+
+
+class LibraryCatalog:
+    """Names of the nodegroups inside each library .blend, keyed by path, mtime and size.
+
+    A library Blender can't read is kept with node_groups set to None, so it isn't read again until it changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.is_loaded = False
+        self.is_dirty = False
+
+    def load(self):
+        self.is_loaded = True
+
+        try:
+            with open(self.path, "r") as f:
+                entries = json.loads(f.read())
+        except (OSError, ValueError):
+            return
+
+        self.entries = {
+            filepath: {'stat': entry['stat'], 'node_groups': frozen_names(entry['node_groups'])}
+            for filepath, entry in entries.items()
+        }
+
+    def save(self):
+        if not self.is_dirty:
+            return
+
+        entries = {
+            filepath: {'stat': entry['stat'], 'node_groups': sorted_names(entry['node_groups'])}
+            for filepath, entry in self.entries.items()
+        }
+        with open(self.path, "w") as fp:
+            json.dump(entries, fp=fp, separators=(",", ":"))
+
+        self.is_dirty = False
+
+    def refresh(self, filepath):
+        """Re-reads the nodegroup names of a library if it changed since it was cataloged. Returns whether it did."""
+        if not self.is_loaded:
+            self.load()
+
+        filepath = os.path.normpath(filepath)
+        key = stat_key(filepath)
+        entry = self.entries.get(filepath)
+
+        if key is None:
+            self.is_dirty |= self.entries.pop(filepath, None) is not None
+            return entry is not None
+
+        if entry is not None and entry['stat'] == key:
+            return False
+
+        # only the name lists are read, nothing gets appended
+        try:
+            with bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
+                node_groups = frozenset(data_from.node_groups)
+        except OSError:
+            # truncated files and files from newer Blender versions can't be opened
+            node_groups = None
+
+        self.entries[filepath] = {'stat': key, 'node_groups': node_groups}
+        self.is_dirty = True
+        return True
+
+    def node_groups(self, filepath):
+        """The cataloged nodegroup names of a library, or None if it hasn't been cataloged or can't be read."""
+        if not self.is_loaded:
+            self.load()
+
+        entry = self.entries.get(os.path.normpath(filepath))
+        return None if entry is None else entry['node_groups']
+
+    def is_unreadable(self, filepath):
+        entry = self.entries.get(os.path.normpath(filepath))
+        return entry is not None and entry['node_groups'] is None
+
+    def has_group(self, filepath, group_name):
+        self.refresh(filepath)
+        node_groups = self.node_groups(filepath)
+        return node_groups is not None and group_name in node_groups
+
+
+catalog = LibraryCatalog(catalog_path)
@@ -0,0 +1,98 @@
+import bpy
+from bpy.types import Operator
+from . import headless, menu_generator, update_handlers
+
+job_poll_interval = 0.25
+
+health_cache = headless.HealthCache()
+health_queue = None
+# issues of every library from the latest check, an empty list means nothing was found
+health_report = {}
+
+
+def is_checking():
+    return health_queue is not None
+
+
+def remaining_checks():
+    return 0 if health_queue is None else len(health_queue.pending) + len(health_queue.running)
+
+
+def redraw_reports():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type in {'NODE_EDITOR', 'PREFERENCES'}:
+                area.tag_redraw()
+
+
+def start_health_check():
+    """Checks every enabled library, reusing cached results for the ones unchanged since they were last checked."""
+    global health_queue
+    cancel_health_check()
+
+    # the command line check shares the cache, so it's read again every time
+    health_cache.load()
+    filepaths = sorted(update_handlers.library_filepaths())
+    issues, unchecked = health_cache.split(filepaths, menu_generator.config_folder)
+
+    health_report.clear()
+    health_report.update(issues)
+
+    if unchecked:
+        health_queue = headless.WorkerQueue(bpy.app.binary_path, unchecked, "health", menu_generator.config_folder)
+        # persistent, the check would otherwise stop at the next file load and never finish
+        bpy.app.timers.register(poll_health_check, first_interval=job_poll_interval, persistent=True)
+
+    return len(unchecked)
+
+
+def poll_health_check():
+    global health_queue
+    for filepath, result in health_queue.poll():
+        health_report[filepath] = health_cache.add_result(filepath, result, menu_generator.config_folder)
+    redraw_reports()
+
+    if not health_queue.is_done():
+        return job_poll_interval
+
+    health_queue = None
+    health_cache.save()
+    return None
+
+
+def cancel_health_check():
+    global health_queue
+    if bpy.app.timers.is_registered(poll_health_check):
+        bpy.app.timers.unregister(poll_health_check)
+
+    if health_queue is not None:
+        health_queue.cancel()
+        health_queue = None
+
+
+class NODEGROUP_LIBRARY_OT_check_health(Operator):
+    bl_idname = "nodegroup_library.check_health"
+    bl_label = "Check Library Health"
+    bl_description = (
+        "Check every enabled library against its menu config in background Blender processes. "
+        "\nLibraries unchanged since their last check are skipped")
+    bl_options = {"REGISTER"}
+
+    @classmethod
+    def poll(cls, context):
+        return bool(bpy.app.binary_path) and not is_checking()
+
+    def execute(self, context):
+        checking = start_health_check()
+        self.report({'INFO'}, f"Checking {checking} of {len(health_report) + checking} libraries in the background")
+        return {"FINISHED"}
+
+
+def register():
+    bpy.utils.register_class(NODEGROUP_LIBRARY_OT_check_health)
+
+
+def unregister():
+    cancel_health_check()
+    health_report.clear()
+    bpy.utils.unregister_class(NODEGROUP_LIBRARY_OT_check_health)
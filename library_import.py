@@ -0,0 +1,94 @@
+import os
+import bpy
+from pathlib import Path
+from . import headless
+
+job_poll_interval = 0.25
+
+validation_queue = None
+valid_filepaths = []
+failed_results = []
+on_finished = None
+
+
+def scan_blendfiles(directory, recursive=True):
+    pattern = "**/*.blend" if recursive else "*.blend"
+    return sorted(Path(os.path.abspath(filepath)) for filepath in Path(directory).glob(pattern))
+
+
+def entry_indices(entry_list):
+    return {Path(os.path.abspath(entry.filepath)): index for index, entry in enumerate(entry_list) if entry.filepath}
+
+
+def split_new_libraries(entry_list, filepaths):
+    """Filepaths that aren't entries yet, and the ones left out because another entry or file uses the same file name.
+
+    Configs and menu idnames are named after the library's file name, so two libraries named alike would overwrite
+    each other's menus.
+    """
+    indices = entry_indices(entry_list)
+    # compared without case, since the config files can end up on a case-insensitive file system
+    stems = {filepath.stem.casefold() for filepath in indices}
+    new_filepaths = []
+    colliding = []
+
+    for filepath in map(Path, filepaths):
+        if filepath in indices:
+            continue
+
+        stem = filepath.stem.casefold()
+        if stem in stems:
+            colliding.append(filepath)
+        else:
+            stems.add(stem)
+            new_filepaths.append(filepath)
+
+    return new_filepaths, colliding
+
+
+def is_validating():
+    return validation_queue is not None
+
+
+def validate_libraries(filepaths, callback):
+    """Checks filepaths in background Blender processes, one per core at a time, then calls callback(valid, failed)."""
+    global validation_queue, on_finished
+    cancel_validation()
+
+    validation_queue = headless.WorkerQueue(bpy.app.binary_path, filepaths, mode="validate")
+    on_finished = callback
+    # persistent, a file load would otherwise leave the import stuck validating
+    bpy.app.timers.register(poll_validation, first_interval=job_poll_interval, persistent=True)
+
+
+def poll_validation():
+    for filepath, result in validation_queue.poll():
+        if result['ok']:
+            valid_filepaths.append(filepath)
+        else:
+            failed_results.append(result)
+
+    if not validation_queue.is_done():
+        return job_poll_interval
+
+    callback, valid, failed = on_finished, valid_filepaths[:], failed_results[:]
+    reset()
+    callback(valid, failed)
+    return None
+
+
+def reset():
+    global validation_queue, on_finished
+    validation_queue = None
+    valid_filepaths.clear()
+    failed_results.clear()
+    on_finished = None
+
+
+def cancel_validation():
+    if bpy.app.timers.is_registered(poll_validation):
+        bpy.app.timers.unregister(poll_validation)
+
+    if validation_queue is not None:
+        validation_queue.cancel()
+    reset()
@@ -0,0 +1,93 @@
+import bpy
+import os
+from pathlib import Path
+from . import menu_generator, update_handlers
+from .library_catalog import stat_key
+
+# interval multiplier after every poll that finds nothing, up to max_backoff times the preference's interval
+backoff_factor = 2.0
+max_backoff = 8.0
+
+known_stats = {}
+current_interval = 0.0
+
+
+def fetch_interval():
+    return bpy.context.preferences.addons[__package__].preferences.watch_interval
+
+
+def is_stale(filepath, key):
+    # a library that is newer than its config was edited while Blender wasn't watching
+    config_key = stat_key(menu_generator.config_folder / f"{filepath.stem}.json")
+    return config_key is None or config_key[0] < key[0]
+
+
+def changed_libraries():
+    """Libraries whose mtime or size changed since the last poll, or that are new and newer than their config."""
+    changed = []
+    current_stats = {}
+
+    for filepath in update_handlers.library_filepaths():
+        key = current_stats[filepath] = stat_key(filepath)
+        if key is None:
+            continue
+
+        old_key = known_stats.get(filepath)
+        if (old_key is None and is_stale(filepath, key)) or (old_key is not None and old_key != key):
+            changed.append(filepath)
+
+    known_stats.clear()
+    known_stats.update((filepath, key) for filepath, key in current_stats.items() if key is not None)
+    return changed
+
+
+def poll_libraries():
+    global current_interval
+    interval = fetch_interval()
+    if interval <= 0.0:
+        return None
+
+    # the open file is handled by the save handler as soon as it's saved
+    open_file = Path(os.path.abspath(bpy.data.filepath)) if bpy.data.filepath else None
+    changed = [filepath for filepath in changed_libraries() if filepath != open_file]
+
+    for filepath in changed:
+        update_handlers.start_config_job(filepath)
+
+    if changed:
+        current_interval = interval
+    else:
+        current_interval = min(current_interval * backoff_factor, interval * max_backoff)
+
+    return current_interval
+
+
+def start_watcher():
+    global current_interval
+    stop_watcher()
+
+    # other files can only be compiled by a background Blender
+    if fetch_interval() <= 0.0 or not bpy.app.binary_path:
+        return
+
+    current_interval = fetch_interval()
+    bpy.app.timers.register(poll_libraries, first_interval=current_interval, persistent=True)
+
+
+def stop_watcher():
+    if bpy.app.timers.is_registered(poll_libraries):
+        bpy.app.timers.unregister(poll_libraries)
+
+
+def update_watcher(self, context):
+    start_watcher()
+
+
+def register():
+    known_stats.clear()
+    start_watcher()
+
+
+def unregister():
+    stop_watcher()
+    known_stats.clear()
@@ -0,0 +1,222 @@
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+
+# bump whenever the record layout changes, older manifests are then rebuilt from the per-file configs
+MANIFEST_VERSION = 1
+manifest_name = "library.manifest"
+
+
+def manifest_path(folder):
+    return Path(folder) / manifest_name
+
+
+def source_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def menu_signature(filepath, tree_type, data, data_dict):
+    # a menu's draw output depends on its own data, plus the label/icon of its submenus and its nodegroup entries
+    menus = data_dict['menus']
+    nodegroups = data_dict['nodegroups']
+
+    submenus = {idname: (menus[idname]['label'], menus[idname].get('icon', 'NONE'), menus[idname]['items']['submenus'])
+                for group in data['items']['submenus'].values() for idname in group}
+    items = {name: nodegroups[name] for group in data['items']['nodegroups'].values() for name in group}
+
+    text = json.dumps((filepath, tree_type, data, submenus, items), sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def config_signatures(config_dict):
+    filepath = config_dict['filepath']
+    return {menu_idname: menu_signature(filepath, tree, data, data_dict)
+            for tree, data_dict in config_dict['configs'].items()
+            for menu_idname, data in data_dict['menus'].items()}
+
+
+class StringTable:
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.indices = {string: index for index, string in enumerate(self.strings)}
+
+    def __call__(self, string):
+        index = self.indices.get(string)
+        if index is None:
+            index = self.indices[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+
+# records are lists of string table indices, the keys handled here are left out of each record's extras
+menu_fields = ('label', 'is_expandable', 'items')
+item_fields = ('label', 'width', 'node_tree', 'dependencies')
+
+
+def encode_groups(groups, positions, intern):
+    return [[intern(group), [positions[key] for key in keys]] for group, keys in groups.items()]
+
+
+def encode_config(name, config_dict, signatures, intern):
+    trees = []
+
+    for tree_type, data_dict in config_dict['configs'].items():
+        menus = data_dict['menus']
+        nodegroups = data_dict['nodegroups']
+        menu_positions = {idname: position for position, idname in enumerate(menus)}
+        item_positions = {key: position for position, key in enumerate(nodegroups)}
+
+        menu_records = [[
+            intern(idname),
+            intern(data['label']),
+            int(data['is_expandable']),
+            encode_groups(data['items']['submenus'], menu_positions, intern),
+            encode_groups(data['items']['nodegroups'], item_positions, intern),
+            {key: value for key, value in data.items() if key not in menu_fields},
+            intern(signatures[idname]),
+        ] for idname, data in menus.items()]
+
+        item_records = [[
+            intern(key),
+            intern(data['label']),
+            data['width'],
+            intern(data['node_tree']),
+            [intern(name) for name in data['dependencies']] if 'dependencies' in data else None,
+            {field: value for field, value in data.items() if field not in item_fields},
+        ] for key, data in nodegroups.items()]
+
+        trees.append([intern(tree_type), menu_records, item_records])
+
+    return [intern(name), intern(config_dict['filepath']), trees]
+
+
+def decode_config(record, strings):
+    """Rebuilds a config exactly as json.loads would read it from its file, along with its menu signatures."""
+    name, filepath, trees = record
+    configs = {}
+    signatures = {}
+
+    for tree_type, menu_records, item_records in trees:
+        item_keys = [strings[item[0]] for item in item_records]
+        menu_idnames = [strings[menu[0]] for menu in menu_records]
+
+        nodegroups = {}
+        for key, (_, label, width, node_tree, dependencies, extras) in zip(item_keys, item_records):
+            data = {'label': strings[label], 'width': width, 'node_tree': strings[node_tree]}
+            if dependencies is not None:
+                data['dependencies'] = [strings[index] for index in dependencies]
+            nodegroups[key] = data | extras
+
+        menus = {}
+        for idname, (_, label, is_expandable, submenus, groups, extras, signature) in zip(menu_idnames, menu_records):
+            menus[idname] = {
+                'label': strings[label],
+                'items': {
+                    'submenus': {strings[group]: [menu_idnames[i] for i in keys] for group, keys in submenus},
+                    'nodegroups': {strings[group]: [item_keys[i] for i in keys] for group, keys in groups},
+                },
+            } | extras
+            menus[idname]['is_expandable'] = bool(is_expandable)
+            signatures[idname] = strings[signature]
+
+        configs[strings[tree_type]] = {'menus': menus, 'nodegroups': nodegroups}
+
+    return strings[name], {'filepath': strings[filepath], 'configs': configs}, signatures
+
+
+def read_manifest(folder):
+    try:
+        with open(manifest_path(folder), "r") as f:
+            manifest = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def is_current(manifest, paths):
+    # stale as soon as a config was written, added or removed after the manifest
+    sources = manifest['sources']
+    return sources.keys() == {path.name for path in paths} and all(
+        sources[path.name] == source_key(path) for path in paths)
+
+
+def load_manifest(folder, paths):
+    """Every config of the folder from a single read of its manifest, or None if it is missing or stale.
+
+    Returns {config_path: (stat_key, config_dict, signatures)}.
+    """
+    folder = Path(folder)
+    manifest = read_manifest(folder)
+    if manifest is None or not is_current(manifest, paths):
+        return None
+
+    strings = manifest['strings']
+    loaded = {}
+    for record in manifest['configs']:
+        name, config_dict, signatures = decode_config(record, strings)
+        loaded[folder / name] = (manifest['sources'][name], config_dict, signatures)
+
+    return loaded
+
+
+def write_manifest(folder, configs, signatures=None):
+    """Writes configs, a {config_path: config_dict} dict, as the folder's manifest.
+
+    signatures can hold already computed menu signatures by config path, the rest are computed here.
+    """
+    folder = Path(folder)
+    signatures = {} if signatures is None else signatures
+    intern = StringTable()
+    sources = {}
+    records = []
+
+    for path, config_dict in configs.items():
+        path = Path(path)
+        key = source_key(path)
+        if key is None:
+            continue
+
+        sources[path.name] = key
+        menu_signatures = signatures.get(path) or config_signatures(config_dict)
+        records.append(encode_config(path.name, config_dict, menu_signatures, intern))
+
+    manifest = {'version': MANIFEST_VERSION, 'sources': sources, 'strings': intern.strings, 'configs': records}
+
+    # written to a temporary file first, so a reader never sees half a manifest
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    with os.fdopen(fd, "w") as fp:
+        json.dump(manifest, fp=fp, separators=(",", ":"))
+    os.replace(temp_path, manifest_path(folder))
+
+
+def update_manifest(folder, config_path):
+    """Refreshes one written config in the folder's manifest, rebuilding it from every config file if it can't be read."""
+    folder = Path(folder)
+    config_path = Path(config_path)
+    manifest = read_manifest(folder)
+    configs = {}
+    signatures = {}
+
+    if manifest is not None:
+        strings = manifest['strings']
+        for record in manifest['configs']:
+            name, old_config, old_signatures = decode_config(record, strings)
+            configs[folder / name] = old_config
+            signatures[folder / name] = old_signatures
+
+    # configs written since the manifest, or by another worker at the same time, are read from their files
+    paths = sorted(folder.glob("*.json"))
+    for path in paths:
+        if manifest is None or path == config_path or manifest['sources'].get(path.name) != source_key(path):
+            with open(path, "r") as f:
+                configs[path] = json.loads(f.read())
+            signatures.pop(path, None)
+
+    write_manifest(folder, {path: configs[path] for path in paths}, signatures)
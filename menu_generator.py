@@ -1,63 +1,63 @@
 import bpy
 from pathlib import Path
-import json
-from .operators import NODE_OT_NODEGROUP_LIBRARY_append_group as append_nodegroup
+from collections import OrderedDict
+from contextlib import contextmanager
 from .operators import NodegroupLibrary_BaseMenu as NGL_BaseMenu
+from .operators import library_items, library_categories, library_dependencies
+from .draw_plans import spacing, compile_compact, compile_expanded, compile_page, paginate, run_plan
+from .config_store import ConfigStore
+from .pref_snapshot import snapshot
+from .library_catalog import catalog
+from .search_index import search_index
+from .perf_stats import stats
+from .manifest import menu_signature, load_manifest, write_manifest
 
 config_folder = Path(__file__).parent / "menu_configs"
-config_files = list(config_folder.glob("*.json"))
-
-menu_classes = []
-menu_draw_funcs = []
-spacing = 0.65
-default_menu_text = "unnamed_menu"
-
-
-def fetch_user_prefs(prop_name=None):
-    ADD_ON_PATH = Path(__file__).parent.name
-    prefs = bpy.context.preferences.addons[ADD_ON_PATH].preferences
-    return prefs if (prop_name is None) else getattr(prefs, prop_name)
-
-
-def append_submenu_to_parent(menu, icon):
-    def draw(self, context):
-        self.layout.menu(menu.bl_idname, icon=icon)
-
-    menu_draw_funcs.append(draw)
-    bpy.types.NODE_MT_nodegroup_library.append(draw)
-    return draw
+config_store = ConfigStore(config_folder)
+
+menu_classes = {}
+main_menus = {}
+tree_main_menus = {}
+loaded_configs = {}
+loaded_items = {}
+loaded_tree_types = {}
+sync_suspended = False
+patch_pending = False
+menu_specs = {}
+lazy_menus = OrderedDict()
+pending_menus = set()
+max_lazy_menus = 512
 
 
 class NODE_MT_nodegroup_library(bpy.types.Menu):
     bl_label = "User Library"
     bl_idname = "NODE_MT_nodegroup_library"
 
-    valid_nodetrees = []
+    valid_nodetrees = frozenset()
 
     @classmethod
     def set_valid_nodetrees(cls):
-        nodetrees = []
-        for config in config_files:
-            with open(config, "r") as f:
-                config_dict = json.loads(f.read())
-
-            nodetrees += list(config_dict['configs'].keys())
-
-        cls.valid_nodetrees = list(set(nodetrees))
+        cls.valid_nodetrees = frozenset().union(*loaded_tree_types.values())
 
     @classmethod
     def poll(cls, context):
-        return context.space_data.tree_type in cls.valid_nodetrees
+        return getattr(context.space_data, "tree_type", None) in cls.valid_nodetrees
 
     def draw(self, context):
-        pass
+        layout = self.layout
+        layout.operator("nodegroup_library.search", icon='VIEWZOOM')
+        layout.separator()
+
+        # only the main menus of the editor's tree type are drawn, whatever else is loaded
+        for menu_idname, icon in tree_main_menus.get(context.space_data.tree_type, ()):
+            layout.menu(menu_idname, icon=icon)
 
 
 def draw_library_menu(self, context):
-    if fetch_user_prefs("enable_parent_menu"):
+    if snapshot.enable_parent_menu:
         self.layout.menu("NODE_MT_nodegroup_library", icon='ASSET_MANAGER')
 
-    elif context.space_data.tree_type in NODE_MT_nodegroup_library.valid_nodetrees:
+    elif getattr(context.space_data, "tree_type", None) in NODE_MT_nodegroup_library.valid_nodetrees:
         self.layout.separator(factor=spacing)
         self.layout.menu_contents("NODE_MT_nodegroup_library")
 
@@ -65,80 +65,32 @@ def draw_library_menu(self, context):
 def generate_menu(filepath, menu_data, data_dict, tree_type):
     menu_idname, data = menu_data
     submenu_groups = data['items']['submenus']
-    nodegroup_items = data['items']['nodegroups']
-    nodegroups = data_dict['nodegroups']
     menus = data_dict['menus']
 
-    def draw_compact(self, context):
-        layout = self.layout
-
-        for group in submenu_groups.values():
-            layout.separator(factor=spacing)
-            for submenu_idname in group:
-                icon = menus[submenu_idname].get('icon', 'NONE')
-                layout.menu(submenu_idname, icon=icon)
+    # submenus of this menu's submenus are requested ahead, so they are registered before the user can hover them
+    submenu_idnames = [idname for group in submenu_groups.values() for idname in group]
+    prefetch = [menu_idname, *submenu_idnames]
+    for submenu_idname in submenu_idnames:
+        prefetch.extend(idname for group in menus[submenu_idname]['items']['submenus'].values() for idname in group)
+    prefetch = tuple(prefetch)
 
-        if submenu_groups and nodegroup_items:
-            layout.separator(factor=spacing)
+    available = catalog.node_groups(filepath)
+    # pages are worked out here once, so drawing a category never lays out more than page_size nodegroups
+    pages = paginate(menu_idname, data, data_dict, snapshot.page_size, snapshot.page_mode == 'ALPHABETICAL')
+    page_classes = tuple(generate_page(page, data_dict, tree_type, available) for page in pages)
 
-        for group_index, group in nodegroup_items.items():
-            layout.separator(factor=spacing)
-            for nodegroup in group:
-                nodegroup_data = nodegroups[nodegroup]
-                label = nodegroup_data['label']
-                nodetree_name = nodegroup_data['node_tree']
-                label = label if label != '' else nodetree_name
+    compact_plan = compile_compact(menu_idname, data, data_dict, available, pages)
+    if data['is_expandable']:
+        expanded_plans = {
+            hide: compile_expanded(menu_idname, data, data_dict, hide, available, pages) for hide in (False, True)}
 
-                props = layout.operator(append_nodegroup.bl_idname, text=label, icon=nodegroup_data.get("icon", 'NONE'))
-                props.filepath = filepath
-                props.group_name = nodetree_name
-                props.width = nodegroup_data['width']
+    def draw_compact(self, context):
+        request_menus(prefetch)
+        run_plan(self.layout, compact_plan)
 
     def draw_expanded(self, context):
-        layout = self.layout
-
-        row = layout.row()
-        for group_index, group in submenu_groups.items():
-            if group_index != "null":
-                col = row.column()
-
-            for index, submenu_idname in enumerate(group):
-                submenu_data = menus[submenu_idname]
-
-                if group_index == "null":
-                    col = row.column()
-                elif index > 0:
-                    col.separator(factor=spacing)
-
-                label = submenu_data['label']
-                icon = submenu_data.get('icon', 'NONE')
-                if label != '' or icon != 'NONE' or not fetch_user_prefs("hide_empty_headers"):
-                    text = label if label != '' else default_menu_text
-                    col.label(text=text, icon=icon)
-                    col.separator(factor=spacing)
-
-                col.menu_contents(submenu_idname)
-
-        if not nodegroup_items:
-            return
-
-        col = row.column()
-        if submenu_groups:
-            col.label(text="Misc.")
-            col.separator(factor=spacing)
-
-        for group_index, group in nodegroup_items.items():
-            layout.separator(factor=spacing)
-            for nodegroup in group:
-                nodegroup_data = nodegroups[nodegroup]
-                label = nodegroup_data['label']
-                nodetree_name = nodegroup_data['node_tree']
-                label = label if label != '' else nodetree_name
-
-                props = col.operator(append_nodegroup.bl_idname, text=label, icon=nodegroup_data.get("icon", 'NONE'))
-                props.filepath = filepath
-                props.group_name = nodetree_name
-                props.width = nodegroup_data['width']
+        request_menus(prefetch)
+        run_plan(self.layout, expanded_plans[snapshot.hide_empty_headers])
 
     menu_class = type(menu_idname, (NGL_BaseMenu,),
                       {
@@ -148,57 +100,441 @@ def generate_menu(filepath, menu_data, data_dict, tree_type):
         "tree_type": tree_type,
         "draw_expanded": draw_expanded,
         "draw_compact": draw_compact,
+        "page_classes": page_classes,
     }
     )
 
-    menu_classes.append(menu_class)
+    return menu_class
+
+
+def generate_page(page, data_dict, tree_type, available):
+    page_idname, label, page_keys = page
+    plan = compile_page(page_keys, data_dict, available)
+
+    def draw_page(self, context):
+        run_plan(self.layout, plan)
+
+    return type(page_idname, (NGL_BaseMenu,), {
+        "bl_idname": page_idname,
+        "bl_label": label,
+        "is_expandable": False,
+        "tree_type": tree_type,
+        "draw_expanded": draw_page,
+        "draw_compact": draw_page,
+    })
+
+
+def collect_menus(config_dict, signatures=None):
+    filepath = config_dict['filepath']
+    collected = {}
+
+    for tree, data_dict in config_dict['configs'].items():
+        for menu_idname, data in data_dict['menus'].items():
+            if signatures is not None:
+                signature = signatures[menu_idname]
+            else:
+                signature = menu_signature(filepath, tree, data, data_dict)
+            collected[menu_idname] = (signature, (filepath, (menu_idname, data), data_dict, tree))
+
+    return collected
+
+
+def register_menu(filepath, menu_data, data_dict, tree_type):
+    menu_idname, data = menu_data
+    menu_class = generate_menu(filepath, menu_data, data_dict, tree_type)
+
+    menu_classes[menu_idname] = menu_class
     bpy.utils.register_class(menu_class)
+    for page_class in menu_class.page_classes:
+        bpy.utils.register_class(page_class)
 
     if menu_idname.endswith('main'):
-        append_submenu_to_parent(menu_class, icon=data.get('icon', 'NONE'))
+        main_menus[menu_idname] = data.get('icon', 'NONE')
+
+
+def unregister_menu(menu_idname):
+    main_menus.pop(menu_idname, None)
+    menu_class = menu_classes.pop(menu_idname)
+    for page_class in menu_class.page_classes:
+        bpy.utils.unregister_class(page_class)
+    bpy.utils.unregister_class(menu_class)
+
+
+def patch_menu(filepath, menu_data, data_dict, tree_type):
+    menu_idname, data = menu_data
+    menu_class = menu_classes[menu_idname]
+
+    # bl_label is read by RNA on registration, so a renamed menu has to be registered again
+    if menu_class.bl_label != data['label']:
+        unregister_menu(menu_idname)
+        register_menu(filepath, menu_data, data_dict, tree_type)
+        return
+
+    new_class = generate_menu(filepath, menu_data, data_dict, tree_type)
+    for attr in ("is_expandable", "draw_expanded", "draw_compact"):
+        setattr(menu_class, attr, getattr(new_class, attr))
+
+    # page labels are registered like any other bl_label, so the pages are swapped out whole
+    for page_class in menu_class.page_classes:
+        bpy.utils.unregister_class(page_class)
+    for page_class in new_class.page_classes:
+        bpy.utils.register_class(page_class)
+    menu_class.page_classes = new_class.page_classes
+
+    if menu_idname in main_menus:
+        main_menus[menu_idname] = data.get('icon', 'NONE')
+
+
+def request_menus(menu_idnames):
+    # classes can't be registered while drawing, so unregistered menus are queued for a timer
+    for menu_idname in menu_idnames:
+        if menu_idname in lazy_menus:
+            lazy_menus.move_to_end(menu_idname)
+        elif menu_idname not in menu_classes and menu_idname in menu_specs:
+            pending_menus.add(menu_idname)
+
+    if pending_menus and not bpy.app.timers.is_registered(flush_pending_menus):
+        bpy.app.timers.register(flush_pending_menus, first_interval=0.0)
+
+
+def flush_pending_menus():
+    while pending_menus:
+        menu_idname = pending_menus.pop()
+        spec = menu_specs.get(menu_idname)
+
+        if spec is not None and menu_idname not in menu_classes:
+            register_menu(*spec[1])
+            lazy_menus[menu_idname] = None
+
+    while len(lazy_menus) > max_lazy_menus:
+        menu_idname, _ = lazy_menus.popitem(last=False)
+        unregister_menu(menu_idname)
+
+
+def eager_menus(menus):
+    # the main menus and their direct submenus have to exist before anything has been drawn
+    eager = set()
+
+    for menu_idname, (signature, args) in menus.items():
+        if menu_idname.endswith('main'):
+            _, data = args[1]
+            eager.add(menu_idname)
+            eager.update(idname for group in data['items']['submenus'].values() for idname in group)
+
+    return eager
+
+
+def reconcile(old_menus, new_menus):
+    for menu_idname in old_menus.keys() - new_menus.keys():
+        menu_specs.pop(menu_idname, None)
+        lazy_menus.pop(menu_idname, None)
+        pending_menus.discard(menu_idname)
+
+        if menu_idname in menu_classes:
+            unregister_menu(menu_idname)
+
+    eager = eager_menus(new_menus)
+
+    for menu_idname, spec in new_menus.items():
+        signature, args = spec
+        old_menu = old_menus.get(menu_idname)
+        menu_specs[menu_idname] = spec
 
+        if menu_idname in eager:
+            lazy_menus.pop(menu_idname, None)
 
-def make_menus(config):
-    with open(config, "r") as f:
-        config_dict = json.loads(f.read())
+        if menu_idname in menu_classes:
+            if old_menu is None or old_menu[0] != signature:
+                patch_menu(*args)
+        elif menu_idname in eager:
+            register_menu(*args)
 
+
+def collect_categories(data_dict):
+    menus = data_dict['menus']
+    categories = {}
+
+    def visit(menu_idname):
+        item_keys = categories.get(menu_idname)
+        if item_keys is not None:
+            return item_keys
+
+        items = menus[menu_idname]['items']
+        item_keys = [key for group in items['nodegroups'].values() for key in group]
+        for group in items['submenus'].values():
+            for submenu_idname in group:
+                item_keys.extend(visit(submenu_idname))
+
+        categories[menu_idname] = item_keys = tuple(item_keys)
+        return item_keys
+
+    for menu_idname in menus:
+        visit(menu_idname)
+
+    return categories
+
+
+def register_library_items(config_dict):
     filepath = config_dict['filepath']
+    item_keys = set()
+    category_keys = set()
+    dependency_keys = set()
+
+    for data_dict in config_dict['configs'].values():
+        for item_key, nodegroup_data in data_dict['nodegroups'].items():
+            library_items[item_key] = (filepath, nodegroup_data['node_tree'], nodegroup_data['width'])
+            item_keys.add(item_key)
 
-    for tree, data_dict in config_dict['configs'].items():
-        for menu_data in data_dict['menus'].items():
-            generate_menu(filepath=filepath, menu_data=menu_data, data_dict=data_dict, tree_type=tree)
+            # configs written before dependencies were recorded fall back to cleaning up duplicates
+            if 'dependencies' in nodegroup_data:
+                dependency_key = (filepath, nodegroup_data['node_tree'])
+                library_dependencies[dependency_key] = tuple(nodegroup_data['dependencies'])
+                dependency_keys.add(dependency_key)
 
+        categories = collect_categories(data_dict)
+        library_categories.update(categories)
+        category_keys.update(categories)
 
-def register():
-    menu_classes.clear()
-    menu_draw_funcs.clear()
+    return item_keys, category_keys, dependency_keys
+
+
+def unregister_library_items(config, keep=(set(), set(), set())):
+    old_keys = loaded_items.pop(config, (set(), set(), set()))
+
+    for registry, old, new in zip((library_items, library_categories, library_dependencies), old_keys, keep):
+        for key in old - new:
+            registry.pop(key, None)
+
+
+def patch_registered_menus(filepaths=None):
+    for menu_idname in tuple(menu_classes):
+        signature, args = menu_specs[menu_idname]
+        if filepaths is None or args[0] in filepaths:
+            patch_menu(*args)
+
+    order_main_menus()
+
+
+def repatch_menus():
+    """Patches every registered menu, once the current deferred_sync block ends if inside one."""
+    global patch_pending
+    if sync_suspended:
+        patch_pending = True
+    # menus that aren't registered yet pick up the change when they are
+    elif hasattr(bpy.types, "NODE_MT_nodegroup_library"):
+        patch_registered_menus()
+
+
+def refresh_library_catalog():
+    # runs from a timer, so reading library files never happens while drawing
+    filepaths = {spec[1][0] for menus in loaded_configs.values() for spec in menus.values()}
+    changed_filepaths = {filepath for filepath in filepaths if catalog.refresh(filepath)}
+    catalog.save()
+    patch_registered_menus(changed_filepaths)
+
+
+def schedule_catalog_refresh():
+    if not bpy.app.timers.is_registered(refresh_library_catalog):
+        # persistent, so opening a file at startup doesn't drop the first refresh
+        bpy.app.timers.register(refresh_library_catalog, first_interval=1.0, persistent=True)
+
+
+def make_menus(config, config_dict, signatures=None):
+    with stats.timed("Config Load"):
+        new_menus = collect_menus(config_dict, signatures)
+        loaded_items[config] = register_library_items(config_dict)
+        loaded_tree_types[config] = set(config_dict['configs'])
+        search_index.add_config(config, config_dict)
+        reconcile({}, new_menus)
+        loaded_configs[config] = new_menus
+
+
+def unload_config(config):
+    unregister_library_items(config)
+    loaded_tree_types.pop(config, None)
+    search_index.remove_config(config)
+    reconcile(loaded_configs.pop(config, {}), {})
+
+
+def reload_config(config):
+    active = active_configs()
+    if active is not None and config not in active:
+        return
+
+    with stats.timed("Config Load"):
+        old_menus = loaded_configs.pop(config, {})
+        config_dict = config_store.get(config)
+        new_menus = collect_menus(config_dict) if config_dict is not None else {}
+
+        new_items = register_library_items(config_dict) if config_dict is not None else (set(), set(), set())
+        unregister_library_items(config, keep=new_items)
+        if config_dict is not None:
+            loaded_items[config] = new_items
+            loaded_tree_types[config] = set(config_dict['configs'])
+            search_index.add_config(config, config_dict)
+        else:
+            loaded_tree_types.pop(config, None)
+            search_index.remove_config(config)
+
+        NODE_MT_nodegroup_library.set_valid_nodetrees()
+        reconcile(old_menus, new_menus)
+        if new_menus:
+            loaded_configs[config] = new_menus
+
+    order_main_menus()
+    schedule_catalog_refresh()
+
+
+def active_configs():
+    """Configs of the enabled entry_list entries in list order, or None when the list is empty and every config is used."""
+    entry_list = bpy.context.preferences.addons[__package__].preferences.entry_list
+    if not entry_list:
+        return None
+
+    configs = (config_folder / f"{Path(entry.filepath).stem}.json" for entry in entry_list if entry.is_enabled)
+    return list(dict.fromkeys(configs))
+
+
+def ordered_configs():
+    active = active_configs()
+    return config_store.paths() if active is None else active
+
+
+def order_main_menus():
+    """Sorts the registered main menus by tree type, in list order, for NODE_MT_nodegroup_library to draw."""
+    partition = {}
+
+    for config in ordered_configs():
+        for menu_idname, (signature, args) in loaded_configs.get(config, {}).items():
+            if menu_idname in main_menus:
+                partition.setdefault(args[3], []).append((menu_idname, main_menus[menu_idname]))
+
+    tree_main_menus.clear()
+    tree_main_menus.update((tree_type, tuple(menus)) for tree_type, menus in partition.items())
+
+
+def sync_entries():
+    """Loads and unloads configs to match entry_list, touching only the entries that changed."""
+    if sync_suspended or not hasattr(bpy.types, "NODE_MT_nodegroup_library"):
+        return
+
+    configs = ordered_configs()
+
+    for config in loaded_configs.keys() - set(configs):
+        unload_config(config)
+
+    added = False
+    for config in configs:
+        if config not in loaded_configs:
+            config_dict = config_store.get(config)
+            if config_dict is not None:
+                make_menus(config, config_dict)
+                added = True
 
     NODE_MT_nodegroup_library.set_valid_nodetrees()
+    order_main_menus()
+    if added:
+        schedule_catalog_refresh()
+
+
+@contextmanager
+def deferred_sync():
+    """Holds back syncing while entries are edited in bulk, then syncs once."""
+    global sync_suspended, patch_pending
+    sync_suspended = True
+    try:
+        yield
+    finally:
+        sync_suspended = False
+        sync_entries()
+        if patch_pending:
+            patch_pending = False
+            repatch_menus()
+
+
+def load_menus():
+    active = active_configs()
+
+    # the manifest holds every config and its menu signatures, read at once instead of parsing each file
+    with stats.timed("Manifest Load"):
+        loaded = load_manifest(config_folder, config_store.paths())
+
+    if loaded is not None:
+        for config, (stat_key, config_dict, signatures) in loaded.items():
+            # disabled entries are cached too, enabling one later then doesn't have to parse its file
+            config_store.prime(config, stat_key, config_dict)
+            if active is None or config in active:
+                make_menus(config, config_dict, signatures)
+        return
+
+    configs = config_store.configs()
+    for config, config_dict in configs.items():
+        if active is None or config in active:
+            make_menus(config, config_dict)
+
+    signatures = {config: {menu_idname: spec[0] for menu_idname, spec in loaded_configs[config].items()}
+                  for config in configs if config in loaded_configs}
+    try:
+        write_manifest(config_folder, configs, signatures)
+    except OSError as error:
+        print(f"Nodegroup Library: couldn't write the config manifest, {error}")
+
+
+def register():
+    menu_classes.clear()
+    main_menus.clear()
+    tree_main_menus.clear()
+    loaded_configs.clear()
+    loaded_items.clear()
+    loaded_tree_types.clear()
+    library_items.clear()
+    library_categories.clear()
+    library_dependencies.clear()
+    search_index.clear()
+    menu_specs.clear()
+    lazy_menus.clear()
+    pending_menus.clear()
 
     if not hasattr(bpy.types, "NODE_MT_nodegroup_library"):
         bpy.utils.register_class(NODE_MT_nodegroup_library)
         bpy.types.NODE_MT_add.append(draw_library_menu)
 
-    for config in config_files:
-        make_menus(config)
+    load_menus()
+    NODE_MT_nodegroup_library.set_valid_nodetrees()
+    order_main_menus()
 
+    schedule_catalog_refresh()
     return
     try:
         if not hasattr(bpy.types, "NODE_MT_nodegroup_library"):
             bpy.utils.register_class(NODE_MT_nodegroup_library)
             bpy.types.NODE_MT_add.append(draw_library_menu)
 
-        for config in config_files:
-            make_menus(config)
+        for config, config_dict in config_store.configs().items():
+            make_menus(config, config_dict)
     except:
         unregister()
 
 
 def unregister():
-    for draw_func in menu_draw_funcs:
-        bpy.types.NODE_MT_nodegroup_library.remove(draw_func)
-    for cls in menu_classes:
-        bpy.utils.unregister_class(cls)
+    for timer in (flush_pending_menus, refresh_library_catalog):
+        if bpy.app.timers.is_registered(timer):
+            bpy.app.timers.unregister(timer)
+
+    for menu_idname in tuple(menu_classes):
+        unregister_menu(menu_idname)
+
+    loaded_configs.clear()
+    loaded_items.clear()
+    loaded_tree_types.clear()
+    tree_main_menus.clear()
+    library_items.clear()
+    library_categories.clear()
+    library_dependencies.clear()
+    search_index.clear()
+    menu_specs.clear()
+    lazy_menus.clear()
+    pending_menus.clear()
 
     if hasattr(bpy.types, "NODE_MT_nodegroup_library"):
         bpy.utils.unregister_class(NODE_MT_nodegroup_library)
@@ -1,8 +1,37 @@
 import bpy
+import os
 import re
+import math
+import time
 from bpy.types import Operator
 from bpy.props import StringProperty, FloatProperty
 from pathlib import Path
+from .pref_snapshot import snapshot
+from .library_catalog import catalog
+from .search_index import search_index
+from .perf_stats import stats
+
+# maps the item key drawn on each menu button to (filepath, group_name, width)
+library_items = {}
+# maps (filepath, group_name) to the names of every nodegroup that group depends on, as recorded in the configs
+library_dependencies = {}
+# maps each generated menu's idname to the item keys of every nodegroup inside it, submenus included
+library_categories = {}
+
+group_node_types = {
+    "GeometryNodeTree": "GeometryNodeGroup",
+    "ShaderNodeTree": "ShaderNodeGroup",
+    "CompositorNodeTree": "CompositorNodeGroup",
+    "TextureNodeTree": "TextureNodeGroup",
+}
+import_modes = (
+    ("APPEND", "Append", "Copy the node group and its dependencies into the current file"),
+    ("LINK", "Link", "Link the node group from its library file, so every file shares one definition"),
+    ("LINK_OVERRIDE", "Link with Override", "Link the node group and make a library override of it"),
+)
+grid_margin = 40.0
+duplicate_suffix = re.compile(r"\.\d+$")
+batch_confirm_threshold = 20
 
 
 def fetch_user_prefs(prop_name=None):
@@ -17,17 +46,19 @@ class NodegroupLibrary_BaseMenu(bpy.types.Menu):
     @classmethod
     def poll(cls, context):
         space = context.space_data
-        is_node_editor = (space.type == 'NODE_EDITOR')
-        is_exists = (space.node_tree is not None)
-        is_valid = space.tree_type == cls.tree_type
-        return all((is_node_editor, is_exists, is_valid))
+        # the tree type goes first, menus of every other tree type are then ruled out after a single lookup
+        return getattr(space, "tree_type", None) == cls.tree_type and space.node_tree is not None
 
     def draw(self, context):
-        if self.is_expandable and fetch_user_prefs("ui_mode") == 'EXPANDED':
+        start = time.perf_counter()
+
+        if self.is_expandable and snapshot.ui_mode == 'EXPANDED':
             self.draw_expanded(context)
         else:
             self.draw_compact(context)
 
+        stats.record_draw(self.bl_idname, time.perf_counter() - start)
+
 
 class NODE_OT_NODEGROUP_LIBRARY_append_group(Operator):
     bl_idname = "nodegroup_library.append_group"
@@ -35,6 +66,7 @@ class NODE_OT_NODEGROUP_LIBRARY_append_group(Operator):
     bl_description = "Append Node Group"
     bl_options = {"REGISTER", "UNDO"}
 
+    item_key: StringProperty()
     group_name: StringProperty()
     tooltip: StringProperty()
     filepath: StringProperty()
@@ -55,32 +87,66 @@ class NODE_OT_NODEGROUP_LIBRARY_append_group(Operator):
 
     @staticmethod
     def remove_duplicate_imports(added_groups):
+        # fallback for configs without dependency data, see append_missing_dependencies
+        unduped_groups = {}
+
+        def unduped(group):
+            unduped_group = unduped_groups.get(group.name)
+            if unduped_group is None:
+                unduped_name = duplicate_suffix.sub("", group.name)
+                unduped_group = unduped_groups[group.name] = bpy.data.node_groups.get(unduped_name, group)
+            return unduped_group
+
         for group in added_groups:
             for node in group.nodes:
-                if node.type == "GROUP":
-                    unduped_name, *_ = re.split("\.\d+$", node.node_tree.name)
-                    node.node_tree = bpy.data.node_groups[unduped_name]
-        for group in added_groups:
-            split_name, *_ = re.split("\.\d+$", group.name)
+                if node.type == "GROUP" and node.node_tree is not None:
+                    unduped_group = unduped(node.node_tree)
+                    if node.node_tree != unduped_group:
+                        node.node_tree = unduped_group
 
-            if len(_) > 0 and split_name in bpy.data.node_groups:
+        for group in added_groups:
+            if duplicate_suffix.search(group.name) and unduped(group) != group:
                 bpy.data.node_groups.remove(group)
 
     def execute(self, context):
-        if self.group_name not in bpy.data.node_groups:
-            old_groups = set(bpy.data.node_groups)
-            filepath = Path(self.filepath)
-            with bpy.data.libraries.load(str(filepath), link=False) as (data_from, data_to):
-                data_to.node_groups.append(self.group_name)
+        with stats.timed("Append"):
+            return self.append_to_tree(context)
+
+    def append_to_tree(self, context):
+        if self.item_key:
+            item = library_items.get(self.item_key)
+            if item is None:
+                self.report({'ERROR'}, f"Library item '{self.item_key}' is no longer available")
+                return {'CANCELLED'}
+            self.filepath, self.group_name, self.width = item
+
+        mode = resolve_import_mode(self.filepath)
+        linked_group = None
+        needs_library = mode != 'APPEND' or self.group_name not in bpy.data.node_groups
 
-            added_groups = tuple(set(bpy.data.node_groups)-old_groups)
+        # checked against the catalog, so a renamed or deleted group fails before its library is opened
+        if needs_library and not catalog.has_group(self.filepath, self.group_name):
+            if catalog.is_unreadable(self.filepath):
+                self.report({'ERROR'}, f"{Path(self.filepath).name} can't be read, it may be damaged or from a newer Blender")
+                return {'CANCELLED'}
+            self.report({'ERROR'}, f"'{self.group_name}' no longer exists in {Path(self.filepath).name}")
+            return {'CANCELLED'}
 
-            if len(added_groups) > 1:
-                self.remove_duplicate_imports(added_groups)
+        if mode != 'APPEND':
+            groups, _ = link_nodegroups(self.filepath, [self.group_name], override=(mode == 'LINK_OVERRIDE'))
+            linked_group = groups[self.group_name]
+
+        elif self.group_name not in bpy.data.node_groups:
+            append_library_nodegroups(self.filepath, [self.group_name])
+
+        with stats.timed("Placement"):
+            bpy.ops.node.add_group(name=self.group_name)
+            if linked_group is not None:
+                # a local group of the same name would otherwise be picked by add_group
+                context.active_node.node_tree = linked_group
+            context.active_node.location = context.space_data.cursor_location
+            context.active_node.width = self.width
 
-        bpy.ops.node.add_group(name=self.group_name)
-        context.active_node.location = context.space_data.cursor_location
-        context.active_node.width = self.width
         bpy.ops.node.translate_attach_remove_on_cancel("INVOKE_DEFAULT")
         return {"FINISHED"}
 
@@ -89,8 +155,313 @@ class NODE_OT_NODEGROUP_LIBRARY_append_group(Operator):
         return self.execute(context)
 
 
+def resolve_import_mode(filepath):
+    prefs = fetch_user_prefs()
+    filepath = os.path.normpath(filepath)
+
+    for entry in prefs.entry_list:
+        if entry.import_mode != 'DEFAULT' and os.path.normpath(entry.filepath) == filepath:
+            return entry.import_mode
+
+    return prefs.import_mode
+
+
+def find_linked_nodegroup(filepath, group_name):
+    for group in bpy.data.node_groups:
+        library = group.library
+        if library is not None and group.name == group_name:
+            if os.path.normpath(bpy.path.abspath(library.filepath)) == filepath:
+                return group
+
+    return None
+
+
+def find_override(linked_group):
+    for group in bpy.data.node_groups:
+        override = group.override_library
+        if override is not None and override.reference == linked_group:
+            return group
+
+    return None
+
+
+def link_nodegroups(filepath, group_names, override=False):
+    # groups already linked from the same file are reused instead of being loaded again
+    filepath = os.path.normpath(filepath)
+    groups = {name: find_linked_nodegroup(filepath, name) for name in group_names}
+    to_link = [name for name, group in groups.items() if group is None]
+    missing = []
+
+    if to_link:
+        with stats.timed("Library Load"), bpy.data.libraries.load(filepath, link=True) as (data_from, data_to):
+            available = set(data_from.node_groups)
+            data_to.node_groups = [name for name in to_link if name in available]
+            missing = [name for name in to_link if name not in available]
+
+        for name, group in zip([name for name in to_link if name not in missing], data_to.node_groups):
+            groups[name] = group
+
+    for name in missing:
+        del groups[name]
+
+    if override:
+        groups = {name: find_override(group) or group.override_create(remap_local_usages=True)
+                  for name, group in groups.items()}
+
+    return groups, missing
+
+
+def make_local(group):
+    local_group = group.make_local()
+    # make_local returns a copy when the linked group is still used elsewhere
+    if local_group != group:
+        group.user_remap(local_group)
+    return local_group
+
+
+def append_missing_dependencies(filepath, group_names, closures):
+    """Appends group_names, loading only the dependencies that aren't in the current file yet.
+
+    Appending pulls in the whole dependency tree, so when some of it is already present the groups are linked
+    instead, the missing parts made local and the present ones remapped, leaving no duplicates to clean up.
+    """
+    local_groups = {group.name: group for group in bpy.data.node_groups if group.library is None}
+    required = set().union(*closures)
+    present = required & local_groups.keys()
+
+    if not present:
+        with stats.timed("Library Load"), bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
+            data_to.node_groups = list(group_names)
+        return
+
+    old_libraries = set(bpy.data.libraries)
+    with stats.timed("Library Load"), bpy.data.libraries.load(filepath, link=True) as (data_from, data_to):
+        data_to.node_groups = list(group_names)
+
+    with stats.timed("Dedupe"):
+        library = data_to.node_groups[0].library
+        linked_groups = {group.name: group for group in bpy.data.node_groups if group.library == library}
+
+        for name in (*group_names, *(required - present)):
+            if name in linked_groups:
+                make_local(linked_groups[name])
+
+        for name in present:
+            if name in linked_groups:
+                linked_groups[name].user_remap(local_groups[name])
+
+        if library not in old_libraries:
+            bpy.data.libraries.remove(library)
+
+
+def append_library_nodegroups(filepath, group_names):
+    to_append = [name for name in group_names if name not in bpy.data.node_groups]
+    missing = []
+
+    closures = [library_dependencies.get((filepath, name)) for name in to_append]
+    filepath = str(Path(filepath))
+
+    if to_append and all(closure is not None for closure in closures):
+        catalog.refresh(filepath)
+        available = catalog.node_groups(filepath) or frozenset()
+        missing = [name for name in to_append if name not in available]
+
+        found = [(name, closure) for name, closure in zip(to_append, closures) if name in available]
+        if found:
+            append_missing_dependencies(filepath, [name for name, _ in found], [closure for _, closure in found])
+
+    elif to_append:
+        old_groups = set(bpy.data.node_groups)
+
+        with stats.timed("Library Load"), bpy.data.libraries.load(filepath, link=False) as (data_from, data_to):
+            available = set(data_from.node_groups)
+            data_to.node_groups = [name for name in to_append if name in available]
+            missing = [name for name in to_append if name not in available]
+
+        added_groups = tuple(set(bpy.data.node_groups) - old_groups)
+        if len(added_groups) > 1:
+            with stats.timed("Dedupe"):
+                NODE_OT_NODEGROUP_LIBRARY_append_group.remove_duplicate_imports(added_groups)
+
+    groups = {name: bpy.data.node_groups[name] for name in group_names if name not in missing}
+    return groups, missing
+
+
+def load_nodegroups(requests):
+    """Loads (filepath, group_name) requests with one libraries.load per file, in each file's import mode.
+
+    Returns a {(filepath, group_name): node_group} dict and the requests that weren't found.
+    """
+    requests_by_file = {}
+    for filepath, group_name in requests:
+        requests_by_file.setdefault(filepath, {})[group_name] = None
+
+    groups = {}
+    missing = []
+    for filepath, group_names in requests_by_file.items():
+        mode = resolve_import_mode(filepath)
+
+        if mode == 'APPEND':
+            file_groups, file_missing = append_library_nodegroups(filepath, list(group_names))
+        else:
+            file_groups, file_missing = link_nodegroups(filepath, list(group_names), override=(mode == 'LINK_OVERRIDE'))
+
+        groups.update(((filepath, name), group) for name, group in file_groups.items())
+        missing.extend((filepath, name) for name in file_missing)
+
+    return groups, missing
+
+
+def estimate_node_height(node):
+    # node dimensions stay zero until the node has been drawn once
+    sockets = sum(1 for socket in node.inputs if not socket.hide) + sum(1 for socket in node.outputs if not socket.hide)
+    return 40.0 + 22.0 * sockets
+
+
+def place_nodegroups(context, entries, location):
+    tree = context.space_data.edit_tree
+    node_type = group_node_types[tree.bl_idname]
+    columns = max(1, math.ceil(math.sqrt(len(entries))))
+
+    for node in tree.nodes:
+        node.select = False
+
+    origin_x, y = location
+    x = origin_x
+    row_height = 0.0
+    nodes = []
+
+    for index, (group, width) in enumerate(entries):
+        if index > 0 and index % columns == 0:
+            x = origin_x
+            y -= row_height + grid_margin
+            row_height = 0.0
+
+        node = tree.nodes.new(node_type)
+        node.node_tree = group
+        node.width = width
+        node.location = (x, y)
+        nodes.append(node)
+
+        x += width + grid_margin
+        row_height = max(row_height, estimate_node_height(node))
+
+    if nodes:
+        tree.nodes.active = nodes[-1]
+
+    return nodes
+
+
+def append_nodegroups(context, items, location=None):
+    """Appends (filepath, group_name, width) items and places them in a grid at location.
+
+    Does not push an undo step of its own, call it through nodegroup_library.append_batch for a single one.
+    Returns the names of groups that couldn't be found in their library file.
+    """
+    items = list(items)
+    groups, missing = load_nodegroups((filepath, group_name) for filepath, group_name, _ in items)
+
+    if location is None:
+        location = context.space_data.cursor_location
+
+    entries = [(groups[filepath, group_name], width) for filepath, group_name, width in items
+               if (filepath, group_name) in groups]
+    with stats.timed("Placement"):
+        place_nodegroups(context, entries, location)
+    return sorted(group_name for _, group_name in missing)
+
+
+class NODE_OT_NODEGROUP_LIBRARY_append_batch(Operator):
+    bl_idname = "nodegroup_library.append_batch"
+    bl_label = "Append Node Groups"
+    bl_description = "Append several node groups at once, in a grid at the cursor"
+    bl_options = {"REGISTER", "UNDO"}
+
+    item_keys: StringProperty(description="Semicolon separated item keys of the node groups to append")
+    category: StringProperty(description="Idname of a generated menu whose node groups are all appended")
+
+    @classmethod
+    def poll(cls, context):
+        space = context.space_data
+        return space.type == 'NODE_EDITOR' and space.edit_tree is not None
+
+    @classmethod
+    def description(cls, context, props):
+        if props.category:
+            return f"Append all {len(library_categories.get(props.category, ()))} node groups in this category"
+        return cls.bl_description
+
+    def resolve_keys(self):
+        if self.category:
+            return library_categories.get(self.category, ())
+        return tuple(key for key in self.item_keys.split(";") if key)
+
+    def execute(self, context):
+        item_keys = self.resolve_keys()
+        items = [library_items[key] for key in item_keys if key in library_items]
+
+        if not items:
+            self.report({'WARNING'}, "No node groups to append")
+            return {'CANCELLED'}
+
+        with stats.timed("Append"):
+            missing = append_nodegroups(context, items)
+        if missing:
+            self.report({'WARNING'}, f"Not found in their library files: {', '.join(missing)}")
+
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        NODE_OT_NODEGROUP_LIBRARY_append_group.store_mouse_cursor(context, event)
+
+        if len(self.resolve_keys()) > batch_confirm_threshold:
+            return context.window_manager.invoke_confirm(self, event)
+        return self.execute(context)
+
+
+def search_library_items(self, context, edit_text):
+    space = context.space_data
+    tree_type = space.tree_type if space is not None and space.type == 'NODE_EDITOR' else None
+    return [entry.display for entry in search_index.search(edit_text, tree_type)]
+
+
+class NODE_OT_NODEGROUP_LIBRARY_search(Operator):
+    bl_idname = "nodegroup_library.search"
+    bl_label = "Search Library"
+    bl_description = "Search every node group in the library by name or category"
+    bl_options = {"REGISTER", "UNDO"}
+
+    # results are already ranked, sorting would undo that
+    query: StringProperty(name="", search=search_library_items, search_options=set())
+
+    @classmethod
+    def poll(cls, context):
+        space = context.space_data
+        return space.type == 'NODE_EDITOR' and space.edit_tree is not None
+
+    def draw(self, context):
+        self.layout.activate_init = True
+        self.layout.prop(self, "query", icon='VIEWZOOM')
+
+    def execute(self, context):
+        item_key = search_index.resolve(self.query)
+        if item_key is None:
+            self.report({'WARNING'}, f"No library node group named '{self.query}'")
+            return {'CANCELLED'}
+
+        # the cursor was stored on invoke, before the popup moved the mouse
+        return bpy.ops.nodegroup_library.append_group('EXEC_DEFAULT', item_key=item_key)
+
+    def invoke(self, context, event):
+        NODE_OT_NODEGROUP_LIBRARY_append_group.store_mouse_cursor(context, event)
+        self.query = ""
+        return context.window_manager.invoke_props_dialog(self)
+
+
 classes = (
     NODE_OT_NODEGROUP_LIBRARY_append_group,
+    NODE_OT_NODEGROUP_LIBRARY_append_batch,
+    NODE_OT_NODEGROUP_LIBRARY_search,
 )
 
 
@@ -0,0 +1,61 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+window_size = 20
+
+
+class Timing:
+    __slots__ = ("last", "count", "window")
+
+    def __init__(self):
+        self.last = 0.0
+        self.count = 0
+        self.window = deque(maxlen=window_size)
+
+    def add(self, seconds):
+        self.last = seconds
+        self.count += 1
+        self.window.append(seconds)
+
+    def average(self):
+        return sum(self.window) / len(self.window) if self.window else 0.0
+
+
+class PerfStats:
+    """Last and rolling average durations of the add-on's hot paths, recorded as they run.
+
+    Recording is a dict lookup and a deque append, the totals are only summed when the Utils panel draws them.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.draws = {}
+
+    def record(self, name, seconds, timings=None):
+        timings = self.timings if timings is None else timings
+        timing = timings.get(name)
+        if timing is None:
+            timing = timings[name] = Timing()
+        timing.add(seconds)
+
+    def record_draw(self, menu_idname, seconds):
+        self.record(menu_idname, seconds, self.draws)
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def slowest_draws(self, count=5):
+        return sorted(self.draws.items(), key=lambda item: item[1].average(), reverse=True)[:count]
+
+    def reset(self):
+        self.timings.clear()
+        self.draws.clear()
+
+
+stats = PerfStats()
@@ -0,0 +1,29 @@
+import bpy
+
+
+class PreferenceSnapshot:
+    """Plain copy of the preferences read while drawing, kept current by the properties' update callbacks."""
+
+    __slots__ = ("enable_parent_menu", "hide_empty_headers", "ui_mode", "missing_groups", "page_size", "page_mode")
+
+    def __init__(self):
+        self.enable_parent_menu = True
+        self.hide_empty_headers = False
+        self.ui_mode = 'EXPANDED'
+        self.missing_groups = 'GREY'
+        self.page_size = 100
+        self.page_mode = 'ALPHABETICAL'
+
+    def refresh(self, prefs=None):
+        if prefs is None:
+            prefs = bpy.context.preferences.addons[__package__].preferences
+
+        for attr in self.__slots__:
+            setattr(self, attr, getattr(prefs, attr))
+
+
+snapshot = PreferenceSnapshot()
+
+
+def update_snapshot(self, context):
+    snapshot.refresh(self)
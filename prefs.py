@@ -1,8 +1,14 @@
 import bpy
-from bpy.props import EnumProperty, BoolProperty, StringProperty, CollectionProperty, IntProperty
+from bpy.props import EnumProperty, BoolProperty, StringProperty, CollectionProperty, IntProperty, FloatProperty
 from bpy_extras.io_utils import ImportHelper, ExportHelper
 from pathlib import Path
-from . import prefs_handler
+from . import prefs_handler, menu_generator, library_import
+from .library_watcher import update_watcher
+from .pref_snapshot import snapshot, update_snapshot
+from .operators import import_modes
+from .update_handlers import show_error
+
+max_report_lines = 10
 
 def clamp(value, lower, upper):
     return lower if value < lower else upper if value > upper else value
@@ -12,6 +18,26 @@ def fetch_user_preferences():
     return bpy.context.preferences.addons[__package__].preferences
 
 
+def update_entry(self, context):
+    menu_generator.sync_entries()
+    prefs_handler.update_pref_cache()
+
+
+def update_display(self, context):
+    update_snapshot(self, context)
+    prefs_handler.update_pref_cache()
+
+
+def update_pages(self, context):
+    update_display(self, context)
+    menu_generator.repatch_menus()
+
+
+def update_watch_interval(self, context):
+    update_watcher(self, context)
+    prefs_handler.update_pref_cache()
+
+
 def generate_prefix(name):
     output = ""
 
@@ -26,21 +52,31 @@ class BlendFileEntry(bpy.types.PropertyGroup):
     name: StringProperty(
         name="Name", 
         description="The name used for generating the menu of this .blend file entry", 
-        default="Untitled")
+        default="Untitled",
+        update=prefs_handler.update_pref_cache)
 
     filepath: StringProperty(
         name="Filepath", 
         description="The filepath pointing to where the .blend file is located", 
-        default="")
+        default="",
+        update=update_entry)
 
     prefix: StringProperty(
         name="Prefix", 
         description=(
             "The prefix identifying all nodegroups from this file."
             "\n(This is for avoiding conflicts with similarly named nodegroups from different files)"), 
-        default="")
+        default="",
+        update=prefs_handler.update_pref_cache)
 
-    is_enabled: BoolProperty(name="", description="", default=True)
+    is_enabled: BoolProperty(name="", description="", default=True, update=update_entry)
+
+    import_mode: EnumProperty(
+        name="Import Mode",
+        items=(("DEFAULT", "Use Global", "Use the import mode set in the add-on preferences"), *import_modes),
+        default='DEFAULT',
+        update=prefs_handler.update_pref_cache,
+        description="How node groups from this .blend file are brought into the current file")
 
 
 class NODEGROUP_LIBRARY_UL_UIList(bpy.types.UIList):
@@ -125,6 +161,96 @@ class NODE_OT_NGLibrary_NewEntry(bpy.types.Operator, ImportHelper):
         return{'FINISHED'}
 
 
+def add_library_entries(filepaths):
+    """Adds an entry for every new filepath, with one menu sync and cache write for all of them.
+
+    Returns the added filepaths and the ones skipped because their file name is already taken.
+    """
+    entry_list = fetch_user_preferences().entry_list
+    new_filepaths, colliding = library_import.split_new_libraries(entry_list, filepaths)
+
+    with menu_generator.deferred_sync(), prefs_handler.deferred_writes():
+        for filepath in new_filepaths:
+            item = entry_list.add()
+            item.name = filepath.stem
+            item.filepath = str(filepath)
+            item.prefix = generate_prefix(filepath.stem)
+
+    return new_filepaths, colliding
+
+
+def collision_reasons(colliding):
+    return [(filepath, "another entry already uses this file name") for filepath in colliding]
+
+
+def report_skipped(skipped):
+    """Lists (filepath, reason) pairs in a popup, with the ones that don't fit printed to the console."""
+    if not skipped:
+        return
+
+    lines = [f"{Path(filepath).name}: {reason}" for filepath, reason in skipped[:max_report_lines]]
+    if len(skipped) > max_report_lines:
+        lines.append(f"...and {len(skipped) - max_report_lines} more, see the console")
+    for filepath, reason in skipped:
+        print(f"{filepath}: {reason}")
+
+    show_error("Report: Skipped Files", "\n".join([f"{len(skipped)} files couldn't be added", *lines]))
+
+
+def add_validated_entries(valid, failed):
+    added, colliding = add_library_entries(valid)
+    print(f"Nodegroup Library: added {len(added)} of {len(valid) + len(failed)} .blend files")
+    report_skipped([(result['filepath'], result['error']) for result in failed] + collision_reasons(colliding))
+
+
+class NODE_OT_NGLibrary_ImportFolder(bpy.types.Operator):
+    bl_idname = "nodegroup_library.import_folder"
+    bl_label = "Import Folder"
+    bl_description = "Add every .blend file in a folder as a .blend file entry"
+
+    directory: StringProperty(subtype='DIR_PATH')
+    recursive: BoolProperty(name="Include Subfolders", description="Also add .blend files in subfolders", default=True)
+    validate: BoolProperty(
+        name="Validate Files",
+        description=(
+            "Only add files that open in a background Blender and have a 'Nodegroup Library' node tree."
+            "\nFiles are checked in parallel while Blender stays usable"),
+        default=True)
+
+    def execute(self, context):
+        directory = Path(self.directory)
+        if not directory.is_dir():
+            self.report({'WARNING'}, "Specified path is not a folder.")
+            return {'CANCELLED'}
+
+        if library_import.is_validating():
+            self.report({'WARNING'}, "Another folder import is still being validated.")
+            return {'CANCELLED'}
+
+        entry_list = fetch_user_preferences().entry_list
+        scanned = library_import.scan_blendfiles(directory, self.recursive)
+        filepaths, colliding = library_import.split_new_libraries(entry_list, scanned)
+        report_skipped(collision_reasons(colliding))
+
+        if not filepaths:
+            self.report({'INFO'}, f"No new .blend files found in {directory}")
+            return {'FINISHED'}
+
+        # validation needs a Blender executable to start the workers with
+        if self.validate and bpy.app.binary_path:
+            library_import.validate_libraries(filepaths, add_validated_entries)
+            self.report({'INFO'}, f"Validating {len(filepaths)} .blend files in the background")
+        else:
+            added, _ = add_library_entries(filepaths)
+            self.report({'INFO'}, f"Added {len(added)} .blend file entries")
+
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
 class NODE_OT_NGLibrary_UpdateFilepath(bpy.types.Operator, ImportHelper):
     bl_idname = "nodegroup_library.update_filepath"
     bl_label = "Update Filepath"
@@ -182,6 +308,8 @@ class NODE_OT_NGLibrary_RemoveEntry(bpy.types.Operator):
 
         entry_list.remove(index)
         prefs.current_list_index = clamp(index - 1, lower=0, upper=len(entry_list) - 1)
+        menu_generator.sync_entries()
+        prefs_handler.update_pref_cache()
         return{'FINISHED'}
 
 
@@ -201,6 +329,8 @@ class NODE_OT_NGLibrary_RemoveAllEntries(bpy.types.Operator):
 
         entry_list.clear()
         prefs.current_list_index = 0
+        menu_generator.sync_entries()
+        prefs_handler.update_pref_cache()
         return{'FINISHED'}
 
     def invoke(self, context, event):
@@ -221,20 +351,23 @@ class NODE_OT_NGLibrary_SortAllIEntries(bpy.types.Operator):
         prefs = fetch_user_preferences()
         entry_list = prefs.entry_list
 
-        attrs = ('name', 'filepath', 'prefix', 'is_enabled')
+        attrs = ('name', 'filepath', 'prefix', 'is_enabled', 'import_mode')
         sorted_list = tuple(sorted(entry_list, key=lambda x: x.name.upper()))
 
         if all(a == b for a, b in zip(entry_list, sorted_list)):
             self.report({'INFO'}, f"List is already sorted")
             return{'FINISHED'}
 
-        sorted_data = [(item.name, item.filepath, item.prefix, item.is_enabled) for item in sorted_list]
-        entry_list.clear()
+        sorted_data = [tuple(getattr(item, attr) for attr in attrs) for item in sorted_list]
+
+        # refilling the list would otherwise unload and reload every entry's menus one by one
+        with menu_generator.deferred_sync(), prefs_handler.deferred_writes():
+            entry_list.clear()
 
-        for data in sorted_data:
-            entry = entry_list.add()
-            for attr, value in zip(attrs, data):
-                setattr(entry, attr, value)
+            for data in sorted_data:
+                entry = entry_list.add()
+                for attr, value in zip(attrs, data):
+                    setattr(entry, attr, value)
 
         return{'FINISHED'}
 
@@ -260,6 +393,8 @@ class NODE_OT_NGLibrary_MoveEntry_Up(bpy.types.Operator):
 
         entry_list.move(neighbor_index, index)
         prefs.current_list_index = clamp(neighbor_index, lower=0, upper=len(entry_list) - 1)
+        menu_generator.sync_entries()
+        prefs_handler.update_pref_cache()
         return{'FINISHED'}
 
 
@@ -281,6 +416,8 @@ class NODE_OT_NGLibrary_MoveEntry_Down(bpy.types.Operator):
 
         entry_list.move(neighbor_index, index)
         prefs.current_list_index = clamp(neighbor_index, lower=0, upper=len(entry_list) - 1)
+        menu_generator.sync_entries()
+        prefs_handler.update_pref_cache()
         return{'FINISHED'}
 
 
@@ -303,6 +440,8 @@ class NODE_OT_NGLibrary_MoveEntry_toTop(bpy.types.Operator):
 
         entry_list.move(index, target_index)
         prefs.current_list_index = clamp(target_index, lower=0, upper=max_index)
+        menu_generator.sync_entries()
+        prefs_handler.update_pref_cache()
         return{'FINISHED'}
 
 
@@ -325,6 +464,8 @@ class NODE_OT_NGLibrary_MoveEntry_toBottom(bpy.types.Operator):
 
         entry_list.move(index, target_index)
         prefs.current_list_index = clamp(target_index, lower=0, upper=max_index)
+        menu_generator.sync_entries()
+        prefs_handler.update_pref_cache()
         return{'FINISHED'}
 
 
@@ -351,8 +492,9 @@ class NODE_OT_NGLibrary_ToggleAllEntries(bpy.types.Operator):
         entry_list = prefs.entry_list
         should_enable = self.mode == "ENABLE"
 
-        for item in entry_list:
-            item.is_enabled = should_enable
+        with menu_generator.deferred_sync(), prefs_handler.deferred_writes():
+            for item in entry_list:
+                item.is_enabled = should_enable
 
         return{'FINISHED'}
 
@@ -421,6 +563,9 @@ class NODE_MT_NGLibrary_UIList_BATCH_OPS(bpy.types.Menu):
         layout.operator("nodegroup_library.move_entry_to_top", text="Reorder to Top", icon='TRIA_UP_BAR')
         layout.operator("nodegroup_library.move_entry_to_bottom", text="Reorder to Bottom", icon='TRIA_DOWN_BAR')
 
+        layout.separator()
+        layout.operator("nodegroup_library.import_folder", text="Import Folder", icon='FILE_FOLDER')
+
         layout.separator()
         layout.operator("nodegroup_library.sort_all_entries", text="Sort All by Name", icon='SORTALPHA')
         layout.operator("nodegroup_library.remove_all_entries", text="Remove All Entries", icon='X')
@@ -431,21 +576,28 @@ class NodegroupLibraryPreferences(bpy.types.AddonPreferences):
     bl_idname = __package__
 
     entry_list: CollectionProperty(type=BlendFileEntry)
-    current_list_index: IntProperty(name="", description="Currently selected .blend file entry", default=0)
+    current_list_index: IntProperty(
+        name="",
+        description="Currently selected .blend file entry",
+        default=0,
+        update=prefs_handler.update_pref_cache)
 
     override_entry_info: BoolProperty(
         name='Override Name and Prefix',
         description='When enabled, name and prefix are regenerated from updated filepath',
-        default=True)
+        default=True,
+        update=prefs_handler.update_pref_cache)
 
     enable_parent_menu: BoolProperty(
         name='Enable "User Library" Menu',
         default=True,
+        update=update_display,
         description='When enabled, put all generated menus in a "User Library" menu. \nOtherwise, generated menus will be appended to the Node Add Menu')
 
     hide_empty_headers: BoolProperty(
         name='Hide Empty Headers',
         default=False,
+        update=update_display,
         description="When enabled, in Expanded UI Mode, all headers that don't have text or an icon will be hidden")
 
     ui_mode: EnumProperty(
@@ -455,8 +607,56 @@ class NodegroupLibraryPreferences(bpy.types.AddonPreferences):
             ("EXPANDED", "Expanded", "Draws subcategories as separate columns"),
         ),
         default='EXPANDED',
+        update=update_display,
         description="Specifies how the node subcategories are drawn")
 
+    import_mode: EnumProperty(
+        name="Import Mode",
+        items=import_modes,
+        default='APPEND',
+        update=prefs_handler.update_pref_cache,
+        description="How node groups are brought into the current file, unless a .blend file entry overrides it")
+
+    missing_groups: EnumProperty(
+        name="Missing Node Groups",
+        items=(
+            ("GREY", "Grey Out", "Draw menu entries whose node group is no longer in its library file as disabled"),
+            ("HIDE", "Hide", "Leave out menu entries whose node group is no longer in its library file"),
+        ),
+        default='GREY',
+        update=update_display,
+        description="Specifies how menu entries are drawn when their node group can't be found in its library file")
+
+    page_size: IntProperty(
+        name="Page Size",
+        default=100,
+        min=0,
+        update=update_pages,
+        description=(
+            "Categories with more node groups than this are split into submenus of this many node groups, "
+            "0 to never split them"))
+
+    page_mode: EnumProperty(
+        name="Pages",
+        items=(
+            ("ALPHABETICAL", "Alphabetical", "Sort the node groups of a split category by name, each page covering a range of names"),
+            ("INDEX", "In Order", "Keep the node groups of a split category in library order, each page covering a range of positions"),
+        ),
+        default='ALPHABETICAL',
+        update=update_pages,
+        description="Specifies how the node groups of a split category are divided over its pages")
+
+    watch_interval: FloatProperty(
+        name="Watch Interval",
+        default=5.0,
+        min=0.0,
+        subtype='TIME_ABSOLUTE',
+        unit='TIME_ABSOLUTE',
+        update=update_watch_interval,
+        description=(
+            "Seconds between checks for library files changed outside this Blender session, 0 to turn it off. "
+            "\nChecks slow down while nothing changes"))
+
     def draw(self, context):
         layout = self.layout
         keymap_spacing = 0.15
@@ -469,6 +669,13 @@ class NodegroupLibraryPreferences(bpy.types.AddonPreferences):
         if self.ui_mode == 'EXPANDED':
             col.prop(self, "hide_empty_headers")
 
+        col.prop(self, "import_mode")
+        col.prop(self, "missing_groups")
+        col.prop(self, "page_size")
+        if self.page_size > 0:
+            col.prop(self, "page_mode")
+        col.prop(self, "watch_interval")
+
         col.separator(factor=1)
         col.label(text="User Library:")
         row = col.row()
@@ -511,12 +718,17 @@ class NodegroupLibraryPreferences(bpy.types.AddonPreferences):
             row.operator("nodegroup_library.autogenerate_prefix", text="", icon='EVENT_A')
             row.separator(factor=1.35)
 
+            row = col.row(align=True)
+            row.prop(item, "import_mode")
+            row.separator(factor=1.35)
+
 
 def register():
     bpy.utils.register_class(BlendFileEntry)
     bpy.utils.register_class(NodegroupLibraryPreferences)
     bpy.utils.register_class(NODEGROUP_LIBRARY_UL_UIList)
     bpy.utils.register_class(NODE_OT_NGLibrary_NewEntry)
+    bpy.utils.register_class(NODE_OT_NGLibrary_ImportFolder)
     bpy.utils.register_class(NODE_OT_NGLibrary_RemoveEntry)
     bpy.utils.register_class(NODE_OT_NGLibrary_RemoveAllEntries)
     bpy.utils.register_class(NODE_OT_NGLibrary_SortAllIEntries)
@@ -533,17 +745,20 @@ def register():
 
     prefs_handler.load_pref_cache()
     setattr(prefs_handler, "on_register", False)
+    snapshot.refresh()
 
 
 def unregister():
     try:
-        prefs_handler.update_pref_cache()
+        library_import.cancel_validation()
+        prefs_handler.flush_pref_cache()
         setattr(prefs_handler, "on_register", True)
     finally:
         bpy.utils.unregister_class(BlendFileEntry)
         bpy.utils.unregister_class(NodegroupLibraryPreferences)
         bpy.utils.unregister_class(NODEGROUP_LIBRARY_UL_UIList)
         bpy.utils.unregister_class(NODE_OT_NGLibrary_NewEntry)
+        bpy.utils.unregister_class(NODE_OT_NGLibrary_ImportFolder)
         bpy.utils.unregister_class(NODE_OT_NGLibrary_RemoveEntry)
         bpy.utils.unregister_class(NODE_OT_NGLibrary_RemoveAllEntries)
         bpy.utils.unregister_class(NODE_OT_NGLibrary_SortAllIEntries)
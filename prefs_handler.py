@@ -1,12 +1,23 @@
 import bpy
+import os
 import json
+import tempfile
 from pathlib import Path
+from contextlib import contextmanager
 from bpy.props import StringProperty
 from bpy_extras.io_utils import ImportHelper, ExportHelper
+from . import menu_generator
+from .perf_stats import stats
 
 cache_path = Path(__file__).parent / "userprefs.json"
 on_register = True
 
+# changes within this many seconds of each other are written together
+write_delay = 0.5
+is_dirty = False
+writes_held = False
+pref_schema = None
+
 def fetch_user_preferences():
     return bpy.context.preferences.addons[__package__].preferences
 
@@ -17,52 +28,153 @@ def load_pref_cache():
         save_pref_cache(cache_path)
 
 def set_preference_values(filepath=None):
+    with open(filepath, "r") as f:
+        pref_defaults = json.loads(f.read())
+
+    apply_preferences(pref_defaults)
+
+def apply_values(data, values):
+    properties = data.bl_rna.properties
+
+    for key, value in values.items():
+        # keys from older caches that no longer match a property are skipped
+        if key not in properties or properties[key].is_readonly:
+            continue
+
+        current = getattr(data, key)
+        if properties[key].type != 'STRING' and getattr(properties[key], "is_array", False):
+            current, value = tuple(current), tuple(value)
+
+        if current != value:
+            setattr(data, key, value)
+
+def reconcile_entries(entry_list, entries):
+    """Makes entry_list match entries, matching rows by filepath so unchanged entries are left untouched."""
+    filepaths = [entry.filepath for entry in entry_list]
+    seen = set()
+    index = 0
+
+    for values in entries:
+        filepath = values.get("filepath", "")
+        if filepath in seen:
+            continue
+        seen.add(filepath)
+
+        try:
+            old_index = filepaths.index(filepath, index)
+        except ValueError:
+            entry_list.add()
+            old_index = len(filepaths)
+            filepaths.append(filepath)
+
+        if old_index != index:
+            entry_list.move(old_index, index)
+            filepaths.insert(index, filepaths.pop(old_index))
+
+        apply_values(entry_list[index], values)
+        index += 1
+
+    for old_index in range(len(filepaths) - 1, index - 1, -1):
+        entry_list.remove(old_index)
+
+def apply_preferences(pref_dict):
+    """Applies loaded preferences as one change, with a single menu sync and cache write at the end."""
     prefs = fetch_user_preferences()
     entry_list = prefs.entry_list
 
-    with open(filepath, "r") as f:
-        pref_defaults = json.loads(f.read())
+    with menu_generator.deferred_sync(), deferred_writes():
+        for key, value in pref_dict.items():
+            if key == "entry_list":
+                reconcile_entries(entry_list, value)
+            else:
+                apply_values(prefs, {key: value})
+
+        if prefs.current_list_index >= len(entry_list):
+            prefs.current_list_index = max(len(entry_list) - 1, 0)
+
+def schedule_flush():
+    if bpy.app.timers.is_registered(flush_pref_cache):
+        bpy.app.timers.unregister(flush_pref_cache)
+    bpy.app.timers.register(flush_pref_cache, first_interval=write_delay, persistent=True)
 
-    for key, value in pref_defaults.items():
-        if key == "entry_list":
-            for entry in value:
-                item = entry_list.add()
-                for key, value in entry.items():
-                    setattr(item, key, value)
-        else:
-            setattr(prefs, key, value)
-    
 def update_pref_cache(self = None, context = None):
-    if not on_register:
+    """Marks the preferences as changed, they are written once the changes stop for write_delay seconds."""
+    global is_dirty
+    if on_register:
+        return
+
+    is_dirty = True
+    if not writes_held:
+        schedule_flush()
+
+@contextmanager
+def deferred_writes():
+    """Holds back scheduling the cache write while preferences are changed in bulk."""
+    global writes_held
+    writes_held = True
+    try:
+        yield
+    finally:
+        writes_held = False
+        if is_dirty and not on_register:
+            schedule_flush()
+
+def flush_pref_cache():
+    global is_dirty
+    if bpy.app.timers.is_registered(flush_pref_cache):
+        bpy.app.timers.unregister(flush_pref_cache)
+
+    if is_dirty:
         save_pref_cache(cache_path)
+        is_dirty = False
+
+def rna_schema(rna):
+    fields = []
+
+    for prop in rna.properties:
+        if prop.identifier in {'rna_type', 'bl_idname'} or (prop.is_readonly and prop.type != 'COLLECTION'):
+            continue
+
+        if prop.type == 'COLLECTION':
+            fields.append((prop.identifier, rna_schema(prop.fixed_type)))
+        elif prop.type != 'POINTER':
+            fields.append((prop.identifier, getattr(prop, "is_array", False)))
+
+    return tuple(fields)
+
+def serialize(data, schema):
+    values = {}
+
+    for identifier, field in schema:
+        value = getattr(data, identifier)
+        if isinstance(field, tuple):
+            value = [serialize(item, field) for item in value]
+        elif field:
+            value = list(value)
+        values[identifier] = value
+
+    return values
 
 def save_pref_cache(filepath=None):
+    global pref_schema
     userprefs = fetch_user_preferences()
-    pref_ids = set(dir(userprefs)) - {'__annotations__', '__dict__', '__doc__', '__module__', 
-        '__weakref__', 'bl_idname', 'bl_rna', 'draw', 'rna_type'}
-    pref_dict = {}
 
-    for pref_id in pref_ids:
-        pref_value = getattr(userprefs, pref_id)
+    # the saved properties come from the RNA definition, read once instead of reflecting over dir() on every save
+    if pref_schema is None:
+        pref_schema = rna_schema(userprefs.bl_rna)
+    pref_dict = serialize(userprefs, pref_schema)
 
+    # written next to the target first, so an interrupted write never leaves a truncated file behind
+    filepath = Path(filepath)
+    with stats.timed("Prefs Write"):
+        fd, temp_path = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
         try:
-            if not isinstance(pref_value, str):
-                pref_value = tuple(pref_value)
-        except TypeError:
-            pass
-
-        if pref_id == "entry_list":
-            pref_value = [{
-                "name": i.name, 
-                "prefix": i.prefix, 
-                "filepath": i.filepath, 
-                "is_enabled" : i.is_enabled
-                } for i in pref_value]
-
-        pref_dict[pref_id] = pref_value
-    
-    with open(filepath, "w") as fp:
-        json.dump(pref_dict, fp=fp, indent=4)
+            with os.fdopen(fd, "w") as fp:
+                json.dump(pref_dict, fp=fp, indent=4)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
 
 class JSON_LoaderTemplate(bpy.types.Operator, ImportHelper):
     bl_label = "Load Preferences"
@@ -0,0 +1,247 @@
+import re
+import heapq
+from bisect import bisect_left, insort
+
+token_pattern = re.compile(r"[a-z0-9]+")
+# matches are weighted by the field they were found in: label, node_tree name, category path
+field_weights = (1.0, 0.8, 0.5)
+# how well a query token matches a word of the index
+EXACT, PREFIX, SUBSTRING, FUZZY = 1.0, 0.8, 0.6, 0.5
+min_fuzzy_length = 4
+rerank_factor = 4
+
+
+def tokenize(text):
+    return token_pattern.findall(text.lower())
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def deletions(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def is_one_edit(a, b):
+    # true for a single insertion, deletion, substitution or swap of neighbouring letters
+    if abs(len(a) - len(b)) > 1:
+        return False
+
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    a, b = a[start:], b[start:]
+
+    if len(a) == len(b):
+        return a[1:] == b[1:] or (len(a) > 1 and a[0] == b[1] and a[1] == b[0] and a[2:] == b[2:])
+    return a[1:] == b or a == b[1:]
+
+
+class SearchEntry:
+    __slots__ = ("item_key", "label", "path", "tree_type", "display", "weights")
+
+    def __init__(self, item_key, label, node_tree, path, tree_type):
+        self.item_key = item_key
+        self.label = label
+        self.path = path
+        self.tree_type = tree_type
+        self.display = f"{label}  ({path})" if path else label
+
+        # a word found in several fields counts with its best weight
+        self.weights = {}
+        for weight, text in zip(field_weights, (label, node_tree, path)):
+            for token in tokenize(text):
+                self.weights[token] = max(weight, self.weights.get(token, 0.0))
+
+    def bonus(self, query):
+        label = self.label.lower()
+        if label == query:
+            return 1.0
+        return 0.5 if label.startswith(query) else 0.0
+
+
+def menu_paths(data_dict, separator=" / "):
+    # the category path of every nodegroup, as the labels of the menus leading to it from a main menu
+    menus = data_dict['menus']
+    paths = {}
+
+    def visit(menu_idname, path):
+        items = menus[menu_idname]['items']
+        for group in items['nodegroups'].values():
+            for item_key in group:
+                paths.setdefault(item_key, path)
+
+        for group in items['submenus'].values():
+            for submenu_idname in group:
+                visit(submenu_idname, f"{path}{separator}{menus[submenu_idname]['label']}")
+
+    for menu_idname, data in menus.items():
+        if menu_idname.endswith('main'):
+            visit(menu_idname, data['label'])
+
+    return paths
+
+
+class SearchIndex:
+    """Ranked search over every library nodegroup, updated per config as configs are loaded and reloaded.
+
+    Queries are matched against the vocabulary of distinct words rather than against each entry, through a sorted
+    word list for prefixes, a trigram index for substrings and a deletion index for single typos.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.displays = {}
+        self.config_keys = {}
+        self.postings = {}
+        self.words = []
+        self.grams = {}
+        self.deletes = {}
+        self.generation = 0
+        self._last_search = None
+
+    def _word_keys(self, word):
+        for gram in trigrams(word):
+            yield self.grams, gram
+        if len(word) >= min_fuzzy_length:
+            for deleted in deletions(word) | {word}:
+                yield self.deletes, deleted
+
+    def _add_word(self, word):
+        insort(self.words, word)
+        for index, key in self._word_keys(word):
+            index.setdefault(key, set()).add(word)
+
+    def _remove_word(self, word):
+        del self.words[bisect_left(self.words, word)]
+        for index, key in self._word_keys(word):
+            words = index[key]
+            words.discard(word)
+            if not words:
+                del index[key]
+
+    def _add_entry(self, entry):
+        # labels aren't unique across categories, display strings have to be
+        if entry.display in self.displays:
+            entry.display = f"{entry.display} [{entry.item_key}]"
+
+        self.entries[entry.item_key] = entry
+        self.displays[entry.display] = entry.item_key
+
+        for word, weight in entry.weights.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = {}
+                self._add_word(word)
+            posting[entry.item_key] = weight
+
+    def _remove_entry(self, item_key):
+        entry = self.entries.pop(item_key, None)
+        if entry is None:
+            return
+
+        self.displays.pop(entry.display, None)
+        for word in entry.weights:
+            posting = self.postings[word]
+            del posting[item_key]
+            if not posting:
+                del self.postings[word]
+                self._remove_word(word)
+
+    def add_config(self, config, config_dict):
+        """Indexes the nodegroups of a config, replacing whatever was indexed for it before."""
+        self.remove_config(config)
+        item_keys = set()
+
+        for tree_type, data_dict in config_dict['configs'].items():
+            paths = menu_paths(data_dict)
+            for item_key, nodegroup_data in data_dict['nodegroups'].items():
+                node_tree = nodegroup_data['node_tree']
+                entry = SearchEntry(item_key, nodegroup_data['label'] or node_tree, node_tree,
+                                    paths.get(item_key, ""), tree_type)
+                self._add_entry(entry)
+                item_keys.add(item_key)
+
+        self.config_keys[config] = item_keys
+        self.generation += 1
+
+    def remove_config(self, config):
+        for item_key in self.config_keys.pop(config, ()):
+            self._remove_entry(item_key)
+        self.generation += 1
+
+    def clear(self):
+        self.__init__()
+
+    def match_words(self, query_token):
+        """Words of the index matching query_token, with how well they match."""
+        matches = {}
+
+        start = bisect_left(self.words, query_token)
+        for word in self.words[start:]:
+            if not word.startswith(query_token):
+                break
+            matches[word] = EXACT if word == query_token else PREFIX
+
+        if len(query_token) >= 3:
+            gram_words = [self.grams.get(gram, set()) for gram in trigrams(query_token)]
+            for word in set.intersection(*sorted(gram_words, key=len)):
+                if word not in matches and query_token in word:
+                    matches[word] = SUBSTRING
+
+        if len(query_token) >= min_fuzzy_length:
+            for deleted in deletions(query_token) | {query_token}:
+                for word in self.deletes.get(deleted, ()):
+                    if word not in matches and is_one_edit(query_token, word):
+                        matches[word] = FUZZY
+
+        return matches
+
+    def score_items(self, query_token):
+        scores = {}
+
+        for word, match in self.match_words(query_token).items():
+            for item_key, weight in self.postings[word].items():
+                score = match * weight
+                if score > scores.get(item_key, 0.0):
+                    scores[item_key] = score
+
+        return scores
+
+    def search(self, query, tree_type=None, limit=50):
+        """Ranked entries matching every word of query, restricted to tree_type when given."""
+        query = query.strip().lower()
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return []
+
+        # the search popup asks again on every redraw, not just on every keystroke
+        search_key = (query, tree_type, limit, self.generation)
+        if self._last_search is not None and self._last_search[0] == search_key:
+            return self._last_search[1]
+
+        # the rarest word is scored first, so the others only have to be looked up for its matches
+        token_scores = sorted((self.score_items(token) for token in set(query_tokens)), key=len)
+        totals = token_scores[0]
+        for scores in token_scores[1:]:
+            totals = {item_key: total + scores[item_key] for item_key, total in totals.items() if item_key in scores}
+
+        entries = self.entries
+        if tree_type is not None:
+            totals = {item_key: total for item_key, total in totals.items() if entries[item_key].tree_type == tree_type}
+
+        # the label bonus only reorders entries close to the top, so it is left out of the first cut
+        shortlist = heapq.nlargest(limit * rerank_factor, totals.items(), key=lambda item: item[1])
+        ranked = sorted(((total + entries[item_key].bonus(query), entries[item_key]) for item_key, total in shortlist),
+                        key=lambda pair: (-pair[0], len(pair[1].label), pair[1].label))
+        results = [entry for _, entry in ranked[:limit]]
+
+        self._last_search = (search_key, results)
+        return results
+
+    def resolve(self, display):
+        return self.displays.get(display)
+
+
+search_index = SearchIndex()
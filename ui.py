@@ -1,5 +1,73 @@
 import bpy
-from bpy.types import Panel
+from bpy.types import Panel, Operator
+from . import menu_generator, library_health
+from .perf_stats import stats
+
+# shown in this order, timings that haven't been recorded yet are left out
+timing_rows = (
+    ("Register", "Add-on Registration"),
+    ("Manifest Load", "Manifest Load"),
+    ("Config Parse", "Config Parse"),
+    ("Config Load", "Config Load"),
+    ("Update JSON", "Update JSON"),
+    ("Config Job", "Background Update"),
+    ("Prefs Write", "Preferences Write"),
+    ("Append", "Append"),
+    ("Library Load", "    Library Load"),
+    ("Dedupe", "    Dedupe"),
+    ("Placement", "    Placement"),
+)
+draw_rows = 5
+issue_rows = 20
+
+
+def draw_timing(layout, label, timing):
+    row = layout.row(align=True)
+    row.label(text=label)
+    row.label(text=f"{timing.last * 1000:.2f} ms")
+    row.label(text=f"{timing.average() * 1000:.2f} ms")
+    row.label(text=str(timing.count))
+
+
+def draw_header_row(layout, label):
+    row = layout.row(align=True)
+    for text in (label, "Last", "Average", "Runs"):
+        row.label(text=text)
+
+
+def draw_health(layout):
+    row = layout.row()
+    row.label(text="Library Health")
+    row.operator("nodegroup_library.check_health", text="", icon='FILE_REFRESH')
+
+    if library_health.is_checking():
+        layout.label(text=f"Checking, {library_health.remaining_checks()} libraries left", icon='TIME')
+
+    report = library_health.health_report
+    broken = [(filepath, issues) for filepath, issues in sorted(report.items()) if issues]
+    if report and not broken and not library_health.is_checking():
+        layout.label(text=f"All {len(report)} libraries OK", icon='CHECKMARK')
+
+    rows = 0
+    for filepath, issues in broken:
+        layout.label(text=filepath.name, icon='ERROR')
+        for issue in issues:
+            layout.label(text=f"    {issue}")
+        rows += 1 + len(issues)
+        if rows >= issue_rows:
+            layout.label(text="...and more, run headless.py --health for the full report")
+            break
+
+
+class NODEGROUP_LIBRARY_OT_reset_stats(Operator):
+    bl_idname = "nodegroup_library.reset_stats"
+    bl_label = "Reset Counters"
+    bl_description = "Clear every recorded timing"
+    bl_options = {"REGISTER"}
+
+    def execute(self, context):
+        stats.reset()
+        return {"FINISHED"}
 
 
 class NodegroupLibraryUtils(Panel):
@@ -12,10 +80,40 @@ class NodegroupLibraryUtils(Panel):
     def draw(self, context):
         layout = self.layout
 
+        col = layout.column(align=True)
+        col.label(text=f"Configs: {len(menu_generator.loaded_configs)}")
+        col.label(text=f"Registered Menus: {len(menu_generator.menu_classes)} of {len(menu_generator.menu_specs)}")
+        col.label(text=f"Lazy Menus: {len(menu_generator.lazy_menus)} / {menu_generator.max_lazy_menus}")
+
+        box = layout.box()
+        draw_header_row(box, "Timing")
+        for name, label in timing_rows:
+            timing = stats.timings.get(name)
+            if timing is not None:
+                draw_timing(box, label, timing)
+
+        box = layout.box()
+        draw_header_row(box, "Slowest Menus")
+        for menu_idname, timing in stats.slowest_draws(draw_rows):
+            menu_class = menu_generator.menu_classes.get(menu_idname)
+            draw_timing(box, menu_class.bl_label if menu_class is not None else menu_idname, timing)
+
+        layout.operator(NODEGROUP_LIBRARY_OT_reset_stats.bl_idname, icon='FILE_REFRESH')
+
+        draw_health(layout.box())
+
+
+classes = (
+    NODEGROUP_LIBRARY_OT_reset_stats,
+    NodegroupLibraryUtils,
+)
+
 
 def register():
-    bpy.utils.register_class(NodegroupLibraryUtils)
+    for cls in classes:
+        bpy.utils.register_class(cls)
 
 
 def unregister():
-    bpy.utils.unregister_class(NodegroupLibraryUtils)
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
@@ -1,23 +1,115 @@
 import bpy
-import json
+import os
 from bpy.types import Operator
+from bpy.props import BoolProperty
 from bpy.app.handlers import persistent
 from pathlib import Path
-from . import menu_generator
-from .global_data import icon_list
+from . import menu_generator, config_builder, headless
+from .config_builder import ConfigError
+from .perf_stats import stats
 
 config_folder = Path(__file__).parent / "blendfiles"
-valid_filepaths = list(path.resolve() for path in config_folder.glob("*.blend"))
+
+
+config_queue = None
+queued_filepaths = set()
+job_poll_interval = 0.25
+
+
+def library_filepaths():
+    """Absolute paths of the enabled entry_list libraries, or of the blendfiles/ folder when the list is empty."""
+    entry_list = bpy.context.preferences.addons[__package__].preferences.entry_list
+    if entry_list:
+        return {Path(os.path.abspath(entry.filepath)) for entry in entry_list if entry.is_enabled and entry.filepath}
+    return {Path(os.path.abspath(path)) for path in config_folder.glob("*.blend")}
+
+
+def show_error(title, message):
+    print(f"{title}: {message}")
+    window_manager = bpy.context.window_manager
+
+    def display_error(self, context):
+        for index, line in enumerate(message.splitlines()):
+            icon = 'CANCEL' if (index == 0) else 'NONE'
+            self.layout.label(text=line, icon=icon)
+
+    # timers run without a window in context, so one has to be provided for the popup
+    if window_manager.windows:
+        with bpy.context.temp_override(window=window_manager.windows[0]):
+            window_manager.popup_menu(display_error, title=title)
+
+
+def start_config_job(filepath, first=False):
+    """Queues a background compile of filepath, with at most one worker per CPU running at once.
+
+    first puts it ahead of the pending compiles, for a library the user just saved.
+    """
+    global config_queue
+    if config_queue is None:
+        config_queue = headless.WorkerQueue(bpy.app.binary_path, ())
+
+    # a library saved again while its worker is still running gets regenerated once that worker is done
+    if config_queue.is_running(filepath):
+        queued_filepaths.add(filepath)
+    elif not config_queue.is_queued(filepath):
+        config_queue.add(filepath, first)
+
+    if not bpy.app.timers.is_registered(poll_config_jobs):
+        # persistent, a job still running when another file is opened would otherwise never be polled again
+        bpy.app.timers.register(poll_config_jobs, first_interval=job_poll_interval, persistent=True)
+
+
+def poll_config_jobs():
+    global config_queue
+    for filepath, result in config_queue.poll():
+        stats.record("Config Job", result['elapsed'])
+
+        if not result['ok']:
+            show_error("Report: Error", f"Failed to update menu config for {filepath.name}\n{result['error']}")
+        elif result['changed']:
+            menu_generator.reload_config(menu_generator.config_folder / Path(result['config']).name)
+
+        if filepath in queued_filepaths:
+            queued_filepaths.discard(filepath)
+            start_config_job(filepath, first=True)
+
+    if config_queue.is_done():
+        config_queue = None
+        return None
+    return job_poll_interval
+
+
+def cancel_config_jobs():
+    global config_queue
+    if bpy.app.timers.is_registered(poll_config_jobs):
+        bpy.app.timers.unregister(poll_config_jobs)
+
+    if config_queue is not None:
+        config_queue.cancel()
+        config_queue = None
+    queued_filepaths.clear()
 
 
 @persistent
 def execute_on_save(dummy):
-    file_in_folder = any(list((Path(bpy.data.filepath) == path) for path in valid_filepaths))
+    filepath = Path(os.path.abspath(bpy.data.filepath))
+
+    if filepath not in library_filepaths():
+        return
 
-    if file_in_folder:
-        bpy.ops.nodegroup_library.update_json('EXEC_DEFAULT')
-        menu_generator.unregister()
-        menu_generator.register()
+    # the saved file is compiled by a background Blender, so saving returns right away
+    if bpy.app.binary_path:
+        # the worker never saves the library, so variable nodes are tidied here as the old save path did
+        try:
+            config_builder.tidy_variable_nodes()
+        except (ConfigError, ReferenceError, RuntimeError) as error:
+            # the worker reports whatever is wrong with the layout, so saving goes on
+            print(f"Nodegroup Library: couldn't tidy variable nodes of {filepath.name}: {error}")
+        start_config_job(filepath, first=True)
+
+    elif 'FINISHED' in bpy.ops.nodegroup_library.update_json('EXEC_DEFAULT'):
+        config = menu_generator.config_folder / f"{filepath.stem}.json"
+        menu_generator.reload_config(config)
 
 
 class NODEGROUP_LIBRARY_UPDATE_JSON_CONFIGS(Operator):
@@ -26,6 +118,16 @@ class NODEGROUP_LIBRARY_UPDATE_JSON_CONFIGS(Operator):
     bl_description = "Updates the JSON Config files for menu generation"
     bl_options = {"REGISTER"}
 
+    dry_run: BoolProperty(
+        name="Dry Run",
+        description="Only report what would change and how long generating the configs would take",
+        default=False)
+
+    force: BoolProperty(
+        name="Force",
+        description="Regenerate the configs even if the library layout hasn't changed",
+        default=False)
+
     @staticmethod
     def RAISE_ERROR(error_message):
         def display_error(self, context):
@@ -36,253 +138,38 @@ class NODEGROUP_LIBRARY_UPDATE_JSON_CONFIGS(Operator):
         bpy.context.window_manager.popup_menu(display_error, title='Report: Error')
         raise ValueError(error_message)
 
-    @staticmethod
-    def fetch_nodetrees():
-        data = bpy.data
-        nodetrees = []
-
-        # ===== COMPOSITOR NODETREE =====
-        scene = data.scenes.get('Nodegroup Library')
-        if hasattr(scene, "node_tree") and (scene.node_tree is not None):
-            compositor_tree = scene.node_tree
-            nodetrees.append(compositor_tree)
-
-        # ===== SHADER NODETREE =====
-        material = data.materials.get('Nodegroup Library')
-        if hasattr(material, "node_tree") and (material.node_tree is not None):
-            shader_tree = material.node_tree
-            nodetrees.append(shader_tree)
-
-        # ===== GEOMETRY NODETREE =====
-        nodegroup = data.node_groups.get('Nodegroup Library')
-        if hasattr(nodegroup, 'bl_idname'):
-            if nodegroup.bl_idname == 'GeometryNodeTree':
-                geonodes_tree = nodegroup
-                nodetrees.append(geonodes_tree)
-            else:
-                raise Exception("Nodegroup that isn't of type GeometryNodeTree is named 'Nodegroup Library'")
-
-        # ===== TEXTURE NODETREE =====
-        texture = data.textures.get('Nodegroup Library')
-        if hasattr(texture, 'node_tree'):
-            if hasattr(texture.node_tree, "nodes") and (texture.node_tree is not None):
-                texture_nodes_tree = texture.node_tree
-                nodetrees.append(texture_nodes_tree)
-
-        return nodetrees
-
     @classmethod
     def poll(cls, context):
         return True
 
+    def execute_dry_run(self):
+        try:
+            changes, elapsed = config_builder.preview_library_config()
+        except ConfigError as error:
+            self.RAISE_ERROR(str(error))
+
+        if changes is None:
+            self.report({'INFO'}, f"Menu configs are up to date (checked in {elapsed * 1000:.1f} ms)")
+        else:
+            self.report({'INFO'}, (
+                f"{changes['added']} added, {changes['removed']} removed and {changes['changed']} changed entries. "
+                f"Generation takes {elapsed * 1000:.1f} ms"))
+
+        return {'CANCELLED'}
+
     def execute(self, context):
-        bpy.ops.outliner.orphans_purge(do_recursive=True)
-        filepath = Path(bpy.data.filepath)
-
-        main_name = filepath.name.removesuffix(".blend")
-        abbr = "".join(chars[0] for chars in main_name.replace(" ", "_").split("_")[:10])
-
-        nodetrees = self.fetch_nodetrees()
-
-        def name_hash(menu_name, prefix):
-            hashed_name = str(hash(f'{main_name}{menu_name}'))
-            if hashed_name.startswith("-"):
-                hashed_name = hashed_name.replace("-", "1")
-            hashed_name = hex(int(hashed_name))
-            return generate_idname(hashed_name, prefix)
-
-        def generate_idname(name, prefix):
-            return f'NODEGROUP_LIBRARY_MT_{abbr}_{prefix.upper()}_{name}'
-
-        supported_variables = {
-            'ICON': "string",
-            'GROUP_INDEX': "int",
-            'SORT_INDEX': "int",
-        }
-
-        # ===== MENUS=====
-        def generate_config(nodetree):
-            nodes = nodetree.nodes
-            tree_type = nodetree.bl_idname
-
-            prefix_dict = {
-                "GeometryNodeTree": "GEO",
-                "ShaderNodeTree": "SHAD",
-                "CompositorNodeTree": "COMP",
-                "TextureNodeTree": "TEX",
-            }
-
-            prefix = prefix_dict.get(nodetree.bl_idname, "NULL")
-            main = generate_idname("main", prefix)
-
-            nodegroups = {}
-            menus = {
-                main: {
-                    'label': main_name,
-                    'items': {'submenus': [], 'nodegroups': []},
-                }
-            }
-            property_frames = {}
-
-            def is_property_frame(node):
-                if node is None:
-                    return False
-
-                return node.use_custom_color and tuple(node.color) == (0.0, 1.0, 1.0)
-
-            frames = [node for node in nodes if node.bl_label == 'Frame' and not is_property_frame(node)]
-            prop_frames = [node for node in nodes if node.bl_label == 'Frame' and is_property_frame(node)]
-            groups = [node for node in nodes if node.bl_label == 'Group']
-            variables = [node for node in nodes if node.bl_label == 'Value' and node.mute is False]
-
-            for node in prop_frames:
-                if is_property_frame(node.parent):
-                    error_message = f"PropertyFrame cannot be nested inside another PropertyFrame. \nError at: '{node.label}' - {node}"
-                    self.RAISE_ERROR(error_message)
-
-                name = name_hash(node.name, prefix)
-                property_frames[name] = {}
-
-            for node in frames:
-                name = name_hash(node.name, prefix)
-                parent = name_hash(node.parent.name, prefix) if node.parent is not None else None
-
-                menus[name] = {
-                    'label': node.label,
-                    'items': {'submenus': [], 'nodegroups': []},
-                }
-
-                if parent is not None:
-                    menus[parent]['items']['submenus'].append(name)
-                else:
-                    menus[main]['items']['submenus'].append(name)
-
-            for node in variables:
-                data = node.label.strip().split(":")
-                if len(data) != 2:
-                    error_message = f"Invalid variable data, labels should contain exactly one semicolon. \nError at: '{node.label}' - {node}"
-                    self.RAISE_ERROR(error_message)
-                var_name, value = (value.strip() for value in data)
-
-                var_type = supported_variables.get(var_name)
-                if var_type is None:
-                    error_message = f"'{var_name}' is not a valid variable name. \nError at: '{node.label}' - {node}"
-                    self.RAISE_ERROR(error_message)
-
-                if var_name == 'ICON':
-                    value = value.strip().replace("'", "").replace('"', '').upper()
-                    if value not in icon_list:
-                        error_message = f"'{value}' is not a valid icon name. \nError at: '{node.label}' - {node}"
-                        self.RAISE_ERROR(error_message)
-
-                    node.label = f"{var_name}: {value}"
-                    node.show_options = False
-                    for socket in node.outputs:
-                        socket.hide = True
-
-                elif var_name == 'GROUP_INDEX':
-                    if not value.isdigit():
-                        error_message = f"GROUP_INDEX '{value}' is not a non-negative integer. \nError at: '{node.label}' - {node}"
-                        self.RAISE_ERROR(error_message)
-                    else:
-                        value = int(value)
-                        node.label = f"{var_name}: {value}"
-                        node.show_options = False
-                        for socket in node.outputs:
-                            socket.hide = True
-
-                parent = name_hash(node.parent.name, prefix) if node.parent is not None else main
-                var_lookup = var_name.strip().lower().replace(" ", "_")
-
-                if not is_property_frame(node.parent):
-                    variable = menus[parent].get(var_lookup)
-                    if variable is not None:
-                        error_message = f"Variable '{var_name}' has been defined multiple times for menu {parent}. \nError at: '{node.label}' - {node}"
-                        self.RAISE_ERROR(error_message)
-                    menus[parent][var_lookup] = value
-                else:
-                    variable = property_frames[parent].get(var_lookup)
-                    if variable is not None:
-                        error_message = f"Variable '{var_name}' has been defined multiple times for property frame {parent}. \nError at: '{node.label}' - {node}"
-                        self.RAISE_ERROR(error_message)
-
-                    property_frames[parent][var_lookup] = value
-
-            for node in groups:
-                name = name_hash(node.name, prefix)
-                label = node.label
-
-                parent = name_hash(node.parent.name, prefix) if node.parent is not None else None
-
-                extra_data = {}
-                if is_property_frame(node.parent):
-                    extra_data = property_frames[parent]
-                    parent = name_hash(node.parent.parent.name, prefix) if node.parent.parent is not None else None
-
-                default_data = {
-                    'label': label,
-                    'width': node.width,
-                    'node_tree': node.node_tree.name,
-                }
-
-                nodegroups[name] = default_data | extra_data
-
-                if parent is not None:
-                    menus[parent]['items']['nodegroups'].append(name)
-                else:
-                    menus[main]['items']['nodegroups'].append(name)
-
-            for value in menus.values():
-                does_children_have_submenu = list(len(menus[submenu]['items']['submenus']) == 0 for submenu in value['items']['submenus'])
-                is_expandable = all(does_children_have_submenu) and len(does_children_have_submenu) != 0
-                value['is_expandable'] = is_expandable
-                submenus = value['items']['submenus']
-                groups = value['items']['nodegroups']
-
-                submenu_dict = {}
-                nodegroup_dict = {}
-
-                submenus.sort(key=lambda _: menus[_]['label'])
-                groups.sort(key=lambda _: nodegroups[_]['node_tree'])
-
-                for submenu in submenus:
-                    group_index = menus[submenu].get('group_index', None)
-                    group_index_val = submenu_dict.get(group_index)
-
-                    if group_index_val is None:
-                        submenu_dict[group_index] = [submenu, ]
-                    else:
-                        group_index_val.append(submenu)
-
-                sorted_dict = {i: submenu_dict[i] for i in sorted(submenu_dict, key=lambda _: str(_))}
-
-                for group in groups:
-                    group_index = nodegroups[group].get('group_index', None)
-                    group_index_val = nodegroup_dict.get(group_index)
-
-                    if group_index_val is None:
-                        nodegroup_dict[group_index] = [group, ]
-                    else:
-                        group_index_val.append(group)
-
-                sorted_nodegroup_dict = {i: nodegroup_dict[i] for i in sorted(nodegroup_dict, key=lambda _: str(_))}
-
-                value['items']['submenus'] = sorted_dict
-                value['items']['nodegroups'] = sorted_nodegroup_dict
-
-            return tree_type, menus, nodegroups
-
-        tree_configs = {}
-        for tree in nodetrees:
-            if len([node for node in tree.nodes if node.bl_label in ('Group', 'Frame')]) > 0:
-                tree_type, menus, nodegroups = generate_config(tree)
-                tree_configs[tree_type] = {'menus': menus, 'nodegroups': nodegroups}
-
-        output = {'filepath': str(filepath), 'configs': tree_configs}
-        cache_path = filepath.parent.parent / "menu_configs" / f"{main_name}.json"
-
-        with open(cache_path, "w") as fp:
-            json.dump(output, fp=fp, indent=4)
+        if self.dry_run:
+            return self.execute_dry_run()
+
+        try:
+            with stats.timed("Update JSON"):
+                _, changed = config_builder.generate_library_config(force=self.force)
+        except ConfigError as error:
+            self.RAISE_ERROR(str(error))
+
+        if not changed:
+            self.report({'INFO'}, "Menu configs are already up to date")
+            return {'CANCELLED'}
 
         self.report({'INFO'}, "Successfully update menu configs")
         return {'FINISHED'}
@@ -294,5 +181,6 @@ def register():
 
 
 def unregister():
+    cancel_config_jobs()
     bpy.utils.unregister_class(NODEGROUP_LIBRARY_UPDATE_JSON_CONFIGS)
     bpy.app.handlers.save_post.remove(execute_on_save)